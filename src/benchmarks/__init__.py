@@ -0,0 +1,3 @@
+"""
+Package for benchmarks of the generation and rendering hot paths.
+"""
@@ -0,0 +1,224 @@
+"""
+Benchmarks of the generation and rendering hot paths.
+
+Every benchmark runs one configuration (standard, h_k for each k, non-dense)
+at one depth and records the best wall time over a few repeats, the peak
+traced memory of one extra run under tracemalloc and the triangles per
+second. Results are stored as JSON and compared against a saved baseline.
+check_tile_pyramid also checks that the tile backend counts the same hits as
+a single rasterization over the same extent.
+Rendering always uses the non-interactive Agg backend.
+"""
+import matplotlib
+matplotlib.use('Agg')
+
+import contextlib
+import io
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from src.hk_matrices import hk_triangle_utils
+from src.non_dense_start import non_dense_utils
+from src.standard_matrices import standard_triangle_utils
+from src.utils.compute_utils import apply_sequence_with_cache, generate_combinations, generate_steps
+from src.utils.raster_utils import create_density_grid, grid_counts, rasterize_triangles
+from src.utils.shared_utils import plot_all_combinations, plot_triangles
+from src.utils.tile_utils import TILE_EXTENT, add_pyramid_triangles, create_pyramid, finest_counts
+
+# Word-by-word generation is only benchmarked up to this depth
+LEGACY_MAX_DEPTH = 6
+
+# Default depths of the generation and rendering benchmarks
+GENERATION_DEPTHS = (4, 6, 8)
+RENDER_DEPTHS = (4, 6)
+
+def benchmark_configurations():
+    """Return the benchmarked configurations as name -> (labels, vertices, matrix_map)."""
+    configurations = {
+        'standard': ('ABCDEF', standard_triangle_utils.vertices, standard_triangle_utils.create_matrix_map()),
+    }
+    for k, matrix_map in hk_triangle_utils.create_matrix_maps().items():
+        configurations[f'hk_{k}'] = ('THIK', hk_triangle_utils.vertices, matrix_map)
+    configurations['non_dense'] = ('ABCDEF', non_dense_utils.vertices, non_dense_utils.create_matrix_map())
+    return configurations
+
+def measure(function, repeats=3):
+    """Time a function and trace its peak memory.
+
+    The function is run repeats times for the timing (output discarded) and
+    once more under tracemalloc, so the tracing overhead does not affect the
+    wall time.
+
+    Returns:
+        dict: 'seconds' (best wall time), 'peak_bytes' and 'triangles' (the
+        value returned by the function).
+    """
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            triangles = function()
+            timings.append(time.perf_counter() - start)
+        
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    
+    seconds = min(timings)
+    return {
+        'seconds': seconds,
+        'peak_bytes': peak,
+        'triangles': triangles,
+        'triangles_per_second': triangles / seconds if seconds > 0 else None,
+    }
+
+def _generate(labels, vertices, matrix_map, depth):
+    steps = generate_steps(depth, labels, vertices, matrix_map, None)
+    return sum(len(triangles) for _, triangles, _ in steps)
+
+def _apply_words(labels, vertices, matrix_map, depth):
+    cache = {}
+    count = 0
+    for step in range(1, depth + 1):
+        for sequence in generate_combinations(step, labels):
+            apply_sequence_with_cache(sequence, vertices, matrix_map, cache)
+            count += 1
+    return count
+
+def _plot_triangles(triangles, vertices, depth):
+    with tempfile.TemporaryDirectory() as folder:
+        plot_triangles(triangles, f"Step {depth}", 'purple', vertices, step=depth, output_folder=folder)
+    return len(triangles)
+
+def _plot_all(labels, vertices, matrix_map, depth):
+    with tempfile.TemporaryDirectory() as folder:
+        plot_all_combinations(depth, labels, vertices, matrix_map, output_folder=folder)
+    return len(labels) * (len(labels) ** depth - 1) // (len(labels) - 1)
+
+def run_benchmarks(configurations=None, depths=GENERATION_DEPTHS, render_depths=RENDER_DEPTHS, repeats=3):
+    """Run the benchmark suite.
+
+    Args:
+        configurations: Names of the configurations to run (all by default)
+        depths: Depths of the generation benchmarks
+        render_depths: Depths of the rendering benchmarks
+        repeats: Number of timed runs of each benchmark
+
+    Returns:
+        dict: 'environment' (versions and machine) and 'results', mapping
+        benchmark names such as 'generate_steps/standard/6' to the values
+        returned by measure.
+    """
+    available = benchmark_configurations()
+    results = {}
+    for name in configurations or available:
+        labels, vertices, matrix_map = available[name]
+        cases = [('generate_steps', depth, lambda depth=depth: _generate(labels, vertices, matrix_map, depth)) for depth in depths]
+        cases += [
+            ('apply_sequence_with_cache', depth, lambda depth=depth: _apply_words(labels, vertices, matrix_map, depth))
+            for depth in depths if depth <= LEGACY_MAX_DEPTH
+        ]
+        for depth in render_depths:
+            with contextlib.redirect_stdout(io.StringIO()):
+                steps = generate_steps(depth, labels, vertices, matrix_map, None)
+            triangles = np.concatenate([triangles for _, triangles, _ in steps])
+            cases.append(('plot_triangles', depth, lambda depth=depth, triangles=triangles: _plot_triangles(triangles, vertices, depth)))
+            cases.append(('plot_all_combinations', depth, lambda depth=depth: _plot_all(labels, vertices, matrix_map, depth)))
+        
+        for benchmark, depth, function in cases:
+            key = f"{benchmark}/{name}/{depth}"
+            results[key] = measure(function, repeats)
+            print(f"{key}: {results[key]['seconds']:.3f} s, {results[key]['peak_bytes'] / 2 ** 20:.1f} MiB")
+    
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'machine': platform.platform(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+def save_results(results, filename):
+    """Write benchmark results as JSON."""
+    with open(filename, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f"Saved benchmark results to: {filename}")
+
+def load_results(filename):
+    """Read benchmark results written by save_results."""
+    with open(filename) as handle:
+        return json.load(handle)
+
+def compare_results(results, baseline, tolerance=0.25, min_seconds=0.01):
+    """Flag the benchmarks that got slower or use more memory than in baseline.
+
+    Args:
+        results: Results of run_benchmarks
+        baseline: Earlier results to compare with
+        tolerance: Allowed relative increase of time and peak memory
+        min_seconds: Timings below this in both runs are too noisy to compare
+
+    Returns:
+        list: One dictionary per regression with 'benchmark', 'metric',
+        'baseline', 'current' and 'ratio'. Benchmarks missing from baseline
+        are ignored.
+    """
+    regressions = []
+    for key, current in results['results'].items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if metric == 'seconds' and max(current[metric], previous[metric]) < min_seconds:
+                continue
+            ratio = current[metric] / previous[metric] if previous[metric] else float('inf')
+            if ratio > 1 + tolerance:
+                regressions.append({
+                    'benchmark': key, 'metric': metric, 'baseline': previous[metric], 'current': current[metric], 'ratio': ratio,
+                })
+    return regressions
+
+def check_tile_pyramid(configurations=None, depth=6, levels=4, tile_size=64, chunk_size=20000):
+    """Compare the finest tiles of a pyramid with one rasterization of the whole extent.
+
+    The triangles of every configuration up to depth are added to a pyramid
+    in chunks, as the tiles backend does, and to a single density grid of the
+    same resolution over TILE_EXTENT.
+
+    Returns:
+        list: One dictionary per configuration whose counts differ, with
+        'configuration', 'pixels' (number of differing pixels) and
+        'max_difference'.
+    """
+    available = benchmark_configurations()
+    mismatches = []
+    for name in configurations or available:
+        labels, vertices, matrix_map = available[name]
+        with contextlib.redirect_stdout(io.StringIO()):
+            steps = generate_steps(depth, labels, vertices, matrix_map, None)
+        triangles = np.concatenate([triangles for _, triangles, _ in steps])
+        
+        pyramid = create_pyramid(levels, TILE_EXTENT, tile_size)
+        for start in range(0, len(triangles), chunk_size):
+            add_pyramid_triangles(pyramid, triangles[start:start + chunk_size])
+        grid = create_density_grid(tile_size * 2 ** (levels - 1))
+        rasterize_triangles(triangles, grid, TILE_EXTENT)
+        
+        difference = finest_counts(pyramid) - grid_counts(grid)
+        if difference.any():
+            mismatches.append({
+                'configuration': name,
+                'pixels': int(np.count_nonzero(difference)),
+                'max_difference': int(np.abs(difference).max()),
+            })
+        print(f"tiles/{name}/{depth}: {np.count_nonzero(difference)} pixels differ from a single rasterization")
+    return mismatches
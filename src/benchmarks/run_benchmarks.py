@@ -0,0 +1,57 @@
+"""
+Script to run the benchmark suite and compare it against a saved baseline.
+The tile pyramid is also checked against a single rasterization.
+
+Examples:
+    python run_benchmarks.py --quick --output results.json
+    python run_benchmarks.py --baseline baseline.json
+    python run_benchmarks.py --save-baseline baseline.json
+"""
+import argparse
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.benchmarks.benchmark_utils import (
+    GENERATION_DEPTHS, RENDER_DEPTHS, check_tile_pyramid, compare_results, load_results, run_benchmarks, save_results
+)
+
+def main():
+    """Run the benchmarks; exit with status 1 if a regression or a tile mismatch is found."""
+    parser = argparse.ArgumentParser(description="Benchmark generation and rendering.")
+    parser.add_argument('--configurations', nargs='+', help="Configurations to run (default: all)")
+    parser.add_argument('--quick', action='store_true', help="Small depths only")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file for the results")
+    parser.add_argument('--baseline', help="Baseline JSON file to compare against")
+    parser.add_argument('--save-baseline', help="Also save the results as this baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative slowdown")
+    args = parser.parse_args()
+    
+    depths, render_depths = ((3, 5), (3,)) if args.quick else (GENERATION_DEPTHS, RENDER_DEPTHS)
+    results = run_benchmarks(args.configurations, depths=depths, render_depths=render_depths, repeats=args.repeats)
+    save_results(results, args.output)
+    if args.save_baseline:
+        save_results(results, args.save_baseline)
+    
+    mismatches = check_tile_pyramid(args.configurations, depth=5 if args.quick else 6)
+    for mismatch in mismatches:
+        print(f"Tile mismatch in {mismatch['configuration']}: {mismatch['pixels']} pixels, up to {mismatch['max_difference']} hits")
+    
+    if args.baseline:
+        regressions = compare_results(results, load_results(args.baseline), tolerance=args.tolerance)
+        for regression in regressions:
+            print(
+                f"Regression in {regression['benchmark']}: {regression['metric']} "
+                f"{regression['baseline']:.4g} -> {regression['current']:.4g} ({regression['ratio']:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
 """
 Module for visualizing triangle transformations using h_k matrices.
 Each k value (2, 4, 5, 9) has its own set of matrices: h_k, h_k inverse, t, and t inverse.
+run_hk_sweep scans an arbitrary range of k in one pass over the word tree.
 """
-from matplotlib.collections import PolyCollection
-import matplotlib.pyplot as plt
-from itertools import product
-import numpy as np
+import json
 import os
-from src.utils.shared_utils import plot_all_combinations
+import numpy as np
+# The word helpers used to be defined here; they are still importable from this module
+from src.utils.compute_utils import apply_sequence, apply_sequence_with_cache, generate_combinations, iter_family_steps, unpack_sequence
+from src.utils.coverage_utils import add_counts, create_coverage, finish_step
+from src.utils.exact_utils import integer_inverse
+from src.utils.raster_utils import create_density_grid, grid_counts, rasterize_triangles, save_density_png
+from src.utils.shared_utils import plot_all_combinations, plot_combinations_parallel, pyplot
 
 # Define the vertices of the initial triangle (in columns)
 vertices = np.array([[-1, 2, -1],  # x coordinates
@@ -20,9 +24,17 @@ t_inverse = np.linalg.inv(t)
 # Define h_k matrices for different k values
 k_values = [2, 4, 5, 9]  # The k values we want to use
 
-def create_matrix_maps():
+# Inverse pairs among the labels of each matrix map
+inverse_labels = {'T': 'I', 'I': 'T', 'H': 'K', 'K': 'H'}
+
+def create_matrix_maps(exact=False, k_range=None):
     """Create matrix maps for each k value.
     
+    Args:
+        exact: If True, the inverses are computed as exact integer matrices
+            instead of with np.linalg.inv.
+        k_range: k values to create maps for (defaults to k_values)
+    
     Returns:
         dict: A dictionary mapping k values to their corresponding matrix maps.
         Each matrix map contains:
@@ -31,65 +43,34 @@ def create_matrix_maps():
         - 'H': h_k matrix
         - 'K': h_k inverse
     """
+    inverse = integer_inverse if exact else np.linalg.inv
     matrix_maps = {}
-    for k in k_values:
+    for k in (k_values if k_range is None else k_range):
         # Create h_k matrix and its inverse
         h_k = np.array([[1, 0], [k, 1]])
-        h_k_inverse = np.linalg.inv(h_k)
+        h_k_inverse = inverse(h_k)
         
         # Create matrix map for this k value
         matrix_maps[k] = {
-            'T': t, 'I': t_inverse,  # t and t inverse
+            'T': t, 'I': inverse(t),  # t and t inverse
             'H': h_k, 'K': h_k_inverse  # h_k and h_k inverse
         }
     return matrix_maps
 
-def plot_triangles(triangles, title, color, original=True, step=None, matrix_map=None, output_folder="Spanning_hk"):
-    """Plot triangles efficiently using PolyCollection.
-    
-    Args:
-        triangles: List of triangle vertices
-        title: Plot title
-        color: Color for the triangles
-        original: Whether to plot the original triangle
-        step: Current step number
-        matrix_map: Dictionary mapping labels to matrices
-        output_folder: Folder to save the plot
-    """
-    os.makedirs(output_folder, exist_ok=True)
-
-    fig, ax = plt.subplots(figsize=(10, 10))
-
-    # Plot the original triangle
-    if original:
-        ax.fill(vertices[0], vertices[1], color='gray', alpha=0.5, label='Original')
-
-    # Convert column-based coordinates to list of triangles for PolyCollection
-    triangle_list = [np.column_stack((triangle[0], triangle[1])) for triangle in triangles]
-    poly = PolyCollection(triangle_list, facecolors=color, alpha=0.6, edgecolors='black', linewidths=0.3)
-    ax.add_collection(poly)
-
-    # Set plot properties
-    ax.set_xlim(-10, 10)
-    ax.set_ylim(-10, 10)
-    ax.set_xlabel('x')
-    ax.set_ylabel('y')
-    ax.set_title(title)
-    ax.axhline(0, color='black', linewidth=0.5)
-    ax.axvline(0, color='black', linewidth=0.5)
-    ax.grid()
-
-    # Save the plot
-    filename = os.path.join(output_folder, f"Step_{step}.png" if step is not None else "output.png")
-    plt.savefig(filename, dpi=150, bbox_inches='tight')
-    plt.close(fig)
-
-def run_hk_visualization(max_step=9, colors=None):
+def run_hk_visualization(max_step=9, colors=None, reduced=False, exact=False, processes=None, **plot_options):
     """Run the h_k matrices visualization task for each k value.
     
     Args:
         max_step: Maximum number of transformation steps
         colors: Dictionary mapping k values to colors. If None, uses default colors.
+        reduced: If True, only freely reduced words are drawn (no matrix is
+            followed by its inverse).
+        exact: If True, words are evaluated with exact integer arithmetic.
+        processes: If given, all (k, step) frames are rendered on a process
+            pool of this size instead of one k and one step after another;
+            plot_options are then limited to those of plot_combinations_parallel.
+        **plot_options: Further options for plot_all_combinations, e.g.
+            mode='chunks' to stream triangles with bounded memory.
     """
     if colors is None:
         colors = {
@@ -99,94 +80,96 @@ def run_hk_visualization(max_step=9, colors=None):
             9: 'purple'
         }
     
-    matrix_maps = create_matrix_maps()
+    matrix_maps = create_matrix_maps(exact=exact)
+    
+    labels = 'THIK'  # T, H_k, I (t inverse), K (h_k inverse)
+    jobs = [
+        {
+            'max_step': max_step,
+            'labels': labels,
+            'vertices': vertices,
+            'matrix_map': matrix_maps[k],
+            'color': colors[k],
+            'output_folder': f"Spanning_h{k}",
+            'inverses': inverse_labels if reduced else None,
+            'exact': exact,
+            'title_prefix': f"(h_{k} matrices)",
+            **plot_options
+        }
+        for k in k_values
+    ]
+    
+    if processes is not None:
+        print(f"\nProcessing k = {', '.join(map(str, k_values))} on {processes} processes")
+        plot_combinations_parallel(jobs, processes=processes)
+        return
     
-    for k in k_values:
+    for k, job in zip(k_values, jobs):
         print(f"\nProcessing k = {k}")
-        labels = 'THIK'  # T, H_k, I (t inverse), K (h_k inverse)
-        plot_all_combinations(
-            max_step=max_step,
-            labels=labels,
-            vertices=vertices,
-            matrix_map=matrix_maps[k],
-            color=colors[k],
-            output_folder=f"Spanning_h{k}",
-            title_prefix=f"(h_{k} matrices)"
-        )
+        plot_all_combinations(**job)
 
-def unpack_sequence(sequence_str, matrix_map):
-    """Convert a string of matrix labels into a list of matrices."""
-    try:
-        return [matrix_map[char] for char in sequence_str]
-    except KeyError:
-        valid_labels = ', '.join(sorted(matrix_map.keys()))
-        print(f"Invalid sequence. Use only: {valid_labels}")
-        return None
+def run_hk_sweep(k_range, max_step=8, reduced=False, resolution=512, output_folder="Sweep_hk", color='purple', log_density=False):
+    """Scan many k values at once and summarize their coverage of the window.
 
-def apply_sequence(matrices, points):
-    """Apply a sequence of matrices to points (column-based coordinates)."""
-    for matrix in matrices:
-        points = np.dot(matrix, points)  # Matrix multiplication with column-based coordinates
-    return points
+    All k are generated together by iter_family_steps, so the word tree is
+    walked once and each level is one batched product for the whole range.
+    Every k gets its own raster density images in output_folder/h_{k}, and
+    the covered fraction of the window per k and step is written to
+    sweep_summary.json and plotted against k in coverage_vs_k.png.
 
-def generate_combinations(n, labels):
-    """Generate all combinations of labels of length n."""
-    return [''.join(comb) for comb in product(labels, repeat=n)]
-
-def apply_sequence_with_cache(sequence, points, matrix_map, cache):
-    """Apply a sequence of matrices with caching."""
-    sequence_key = tuple(sequence)
-    
-    if sequence_key in cache:
-        return cache[sequence_key]
-    
-    result = points
-    for label in sequence:
-        result = np.dot(matrix_map[label], result)
-    
-    cache[sequence_key] = result
-    return result
+    Args:
+        k_range: Iterable of k values, e.g. range(2, 40)
+        max_step: Maximum number of transformation steps
+        reduced: If True, only freely reduced words are drawn
+        resolution: Number of pixels along each axis of the images and of
+            the coverage grid
+        output_folder: Folder of the per-k images and the summary
+        color: Colour of covered pixels in the images
+        log_density: If True, write log-density heatmaps instead
 
-def generate_steps(max_step, labels, vertices, matrix_map, cache):
-    """Generate transformations for all steps."""
-    all_steps = []
-    current_step_triangles = [vertices]
-    
-    for step in range(1, max_step + 1):
-        print(f"Step {step}")
-        
-        step_labels = generate_combinations(step, labels)
-        new_triangles = [
-            apply_sequence_with_cache(list(comb), vertices, matrix_map, cache)
-            for comb in step_labels
-        ]
-        
-        current_step_triangles.extend(new_triangles)
-        all_steps.append((step, new_triangles, step_labels))
+    Returns:
+        dict: The summary, with the k values and, per step, the covered
+        fraction and number of uncovered regions of each k.
+    """
+    k_range = list(k_range)
+    if not k_range:
+        raise ValueError("k_range is empty, give at least one k value")
+    matrix_maps = create_matrix_maps(k_range=k_range)
+    grids = [create_density_grid(resolution) for _ in k_range]
+    coverages = [create_coverage(resolution) for _ in k_range]
+    summary = {'k': k_range, 'max_step': max_step, 'reduced': reduced, 'steps': []}
     
-    return all_steps
-
-def plot_all_combinations(max_step, labels, vertices, matrix_map, color='blue', output_folder="Spanning_hk", title_prefix=""):
-    """Plot all possible combinations of transformations up to max_step."""
-    cache = {}
-    all_steps = generate_steps(max_step, labels, vertices, matrix_map, cache)
+    steps = iter_family_steps(
+        max_step, 'THIK', vertices, [matrix_maps[k] for k in k_range], inverses=inverse_labels if reduced else None
+    )
+    for step, triangles, _ in steps:
+        step_summary = {'step': step, 'covered_fraction': [], 'uncovered_regions': []}
+        for k, k_triangles, grid, coverage in zip(k_range, triangles, grids, coverages):
+            rasterize_triangles(k_triangles, grid)
+            add_counts(coverage, grid_counts(grid))
+            stats = finish_step(coverage, step)
+            step_summary['covered_fraction'].append(stats['covered_fraction'])
+            step_summary['uncovered_regions'].append(stats['uncovered_regions'])
+            folder = os.path.join(output_folder, f"h_{k}")
+            os.makedirs(folder, exist_ok=True)
+            save_density_png(grid, os.path.join(folder, f"Step_{step}.png"), color=color, log_density=log_density)
+        summary['steps'].append(step_summary)
+        best = int(np.argmax(step_summary['covered_fraction']))
+        print(f"Completed step {step}: best coverage {step_summary['covered_fraction'][best]:.2%} at k = {k_range[best]}")
     
-    # List to store accumulated triangles
-    cumulative_triangles = []
+    with open(os.path.join(output_folder, "sweep_summary.json"), 'w') as handle:
+        json.dump(summary, handle, indent=2)
     
-    # Plot each step
-    for step, step_triangles, step_labels in all_steps:
-        cumulative_triangles.extend(step_triangles)
-        title = f"Step {step}: Accumulated Transformations {title_prefix}"
-        plot_triangles(
-            cumulative_triangles, 
-            title, 
-            color, 
-            original=True, 
-            step=step,
-            matrix_map=matrix_map,
-            output_folder=output_folder
-        )
-        print(f"Completed step {step} with {len(step_triangles)} new triangles")
-
-# Remove the old run_hk_visualization function at the end 
\ No newline at end of file
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(8, 5))
+    for step_summary in summary['steps']:
+        ax.plot(k_range, step_summary['covered_fraction'], marker='o', markersize=3, label=f"Step {step_summary['step']}")
+    ax.set_xlabel("k")
+    ax.set_ylabel("Covered fraction of the window")
+    ax.set_title("Coverage of the h_k orbits")
+    ax.legend(fontsize='small')
+    filename = os.path.join(output_folder, "coverage_vs_k.png")
+    print(f"Saving plot to: {filename}")
+    fig.savefig(filename)
+    plt.close(fig)
+    return summary
@@ -1,17 +1,32 @@
 """
 Script to run triangle transformations using h_k matrices.
 For each k value (2, 4, 5, 9), generates visualizations using h_k, h_k inverse, t, and t inverse matrices.
+With --sweep K_MIN K_MAX, scans every k in that range at once instead (see run_hk_sweep).
 """
+import argparse
 import sys
 import os
 
 # Add the project root directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.hk_matrices.hk_triangle_utils import run_hk_visualization
+from src.hk_matrices.hk_triangle_utils import run_hk_sweep, run_hk_visualization
 
 def main():
     """Run visualizations for all k values with different colors."""
+    parser = argparse.ArgumentParser(description="Visualize the h_k matrix transformations.")
+    parser.add_argument('--sweep', nargs=2, type=int, metavar=('K_MIN', 'K_MAX'), help="Scan every k from K_MIN to K_MAX")
+    parser.add_argument('--max-step', type=int, default=8, help="Maximum number of transformation steps")
+    args = parser.parse_args()
+    if args.sweep and args.sweep[0] > args.sweep[1]:
+        parser.error(f"--sweep needs K_MIN <= K_MAX, got {args.sweep[0]} > {args.sweep[1]}")
+    
+    if args.sweep:
+        print(f"Sweeping k = {args.sweep[0]}..{args.sweep[1]}...")
+        run_hk_sweep(range(args.sweep[0], args.sweep[1] + 1), max_step=args.max_step)
+        print("Sweep completed!")
+        return
+    
     # Define colors for each k value
     colors = {
         2: 'blue',   # k=2: blue
@@ -21,7 +36,7 @@ def main():
     }
     
     print("Starting h_k matrix transformations...")
-    run_hk_visualization(max_step=8, colors=colors)
+    run_hk_visualization(max_step=args.max_step, colors=colors)
     print("All transformations completed!")
 
 if __name__ == "__main__":
@@ -3,15 +3,24 @@ Module for visualizing triangle transformations using standard matrices.
 Uses matrices A, B, C and their inverses (D, E, F) for transformations.
 """
 import numpy as np
-from src.utils.shared_utils import plot_all_combinations
+from src.utils.exact_utils import integer_inverse
+from src.standard_matrices.standard_triangle_utils import vertices as dense_vertices
+from src.utils.shared_utils import plot_all_combinations, plot_seed_combinations
 
 # Define the vertices of the initial triangle (in columns)
 vertices = np.array([[5.2, 4.6, 5.2],  # x coordinates
                     [4.8, 4.8, 5.4]])  # y coordinates
 
-def create_matrix_map():
+# Inverse pairs among the labels of the matrix map (D, E, F invert A, B, C)
+inverse_labels = {'A': 'D', 'B': 'E', 'C': 'F', 'D': 'A', 'E': 'B', 'F': 'C'}
+
+def create_matrix_map(exact=False):
     """Create the matrix map for standard matrices.
     
+    Args:
+        exact: If True, the inverses are computed as exact integer matrices
+            instead of with np.linalg.inv.
+    
     Returns:
         dict: A dictionary mapping labels to matrices:
         - 'A': Standard matrix A
@@ -27,9 +36,10 @@ def create_matrix_map():
     C = np.array([[3, 4], [-1, -1]])
     
     # Calculate inverses
-    A_inverse = np.linalg.inv(A)
-    B_inverse = np.linalg.inv(B)
-    C_inverse = np.linalg.inv(C)
+    inverse = integer_inverse if exact else np.linalg.inv
+    A_inverse = inverse(A)
+    B_inverse = inverse(B)
+    C_inverse = inverse(C)
     
     # Create matrix map
     return {
@@ -37,12 +47,17 @@ def create_matrix_map():
         'D': A_inverse, 'E': B_inverse, 'F': C_inverse
     }
 
-def run_standard_visualization(max_step=7, colors=None):
+def run_standard_visualization(max_step=7, colors=None, reduced=False, exact=False, **plot_options):
     """Run the standard matrices visualization task.
     
     Args:
         max_step: Maximum number of transformation steps
         colors: Dictionary mapping matrix types to colors. If None, uses default colors.
+        reduced: If True, only freely reduced words are drawn (no matrix is
+            followed by its inverse).
+        exact: If True, words are evaluated with exact integer arithmetic.
+        **plot_options: Further options for plot_all_combinations, e.g.
+            mode='chunks' to stream triangles with bounded memory.
     """
     if colors is None:
         colors = {
@@ -50,7 +65,7 @@ def run_standard_visualization(max_step=7, colors=None):
             'transformed': 'purple'
         }
     
-    matrix_map = create_matrix_map()
+    matrix_map = create_matrix_map(exact=exact)
     labels = 'ABCDEF'  # Labels for matrices
     
     print("\nProcessing standard matrices...")
@@ -61,5 +76,42 @@ def run_standard_visualization(max_step=7, colors=None):
         matrix_map=matrix_map,
         color=colors['transformed'],
         output_folder="Spanning_non_dense",
-        title_prefix="(Non dense start)"
-    ) 
\ No newline at end of file
+        inverses=inverse_labels if reduced else None,
+        exact=exact,
+        title_prefix="(Non dense start)",
+        **plot_options
+    ) 
+
+def run_seed_comparison(max_step=7, colors=None, reduced=False, exact=False, **render_options):
+    """Run the dense (standard) and non dense starts from the same word products.
+
+    Produces the same Spanning_standard and Spanning_non_dense plots as
+    running both visualizations, but the word products are only computed once.
+    
+    Args:
+        max_step: Maximum number of transformation steps
+        colors: Dictionary mapping matrix types to colors. If None, uses default colors.
+        reduced: If True, only freely reduced words are drawn (no matrix is
+            followed by its inverse).
+        exact: If True, word products are computed with exact integer arithmetic.
+        **render_options: Further options for render_step_chunks (backend, cull, ...)
+    """
+    if colors is None:
+        colors = {
+            'original': 'gray',
+            'transformed': 'purple'
+        }
+    
+    print("\nProcessing dense and non dense starts...")
+    plot_seed_combinations(
+        max_step=max_step,
+        labels='ABCDEF',
+        seeds=[dense_vertices, vertices],
+        matrix_map=create_matrix_map(exact=exact),
+        colors=[colors['transformed']] * 2,
+        output_folders=["Spanning_standard", "Spanning_non_dense"],
+        title_prefixes=["(Standard matrices)", "(Non dense start)"],
+        inverses=inverse_labels if reduced else None,
+        exact=exact,
+        **render_options
+    )
\ No newline at end of file
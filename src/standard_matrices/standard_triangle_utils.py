@@ -3,15 +3,23 @@ Module for visualizing triangle transformations using standard matrices.
 Uses matrices A, B, C and their inverses (D, E, F) for transformations.
 """
 import numpy as np
+from src.utils.exact_utils import integer_inverse
 from src.utils.shared_utils import plot_all_combinations
 
 # Define the vertices of the initial triangle (in columns)
 vertices = np.array([[-1, 2, -1],  # x coordinates
                     [-1, -1, 2]])  # y coordinates
 
-def create_matrix_map():
+# Inverse pairs among the labels of the matrix map (D, E, F invert A, B, C)
+inverse_labels = {'A': 'D', 'B': 'E', 'C': 'F', 'D': 'A', 'E': 'B', 'F': 'C'}
+
+def create_matrix_map(exact=False):
     """Create the matrix map for standard matrices.
     
+    Args:
+        exact: If True, the inverses are computed as exact integer matrices
+            instead of with np.linalg.inv.
+    
     Returns:
         dict: A dictionary mapping labels to matrices:
         - 'A': Standard matrix A
@@ -27,9 +35,10 @@ def create_matrix_map():
     C = np.array([[3, 4], [-1, -1]])
     
     # Calculate inverses
-    A_inverse = np.linalg.inv(A)
-    B_inverse = np.linalg.inv(B)
-    C_inverse = np.linalg.inv(C)
+    inverse = integer_inverse if exact else np.linalg.inv
+    A_inverse = inverse(A)
+    B_inverse = inverse(B)
+    C_inverse = inverse(C)
     
     # Create matrix map
     return {
@@ -37,12 +46,17 @@ def create_matrix_map():
         'D': A_inverse, 'E': B_inverse, 'F': C_inverse
     }
 
-def run_standard_visualization(max_step=7, colors=None):
+def run_standard_visualization(max_step=7, colors=None, reduced=False, exact=False, **plot_options):
     """Run the standard matrices visualization task.
     
     Args:
         max_step: Maximum number of transformation steps
         colors: Dictionary mapping matrix types to colors. If None, uses default colors.
+        reduced: If True, only freely reduced words are drawn (no matrix is
+            followed by its inverse).
+        exact: If True, words are evaluated with exact integer arithmetic.
+        **plot_options: Further options for plot_all_combinations, e.g.
+            mode='chunks' to stream triangles with bounded memory.
     """
     if colors is None:
         colors = {
@@ -50,7 +64,7 @@ def run_standard_visualization(max_step=7, colors=None):
             'transformed': 'purple'
         }
     
-    matrix_map = create_matrix_map()
+    matrix_map = create_matrix_map(exact=exact)
     labels = 'ABCDEF'  # Labels for matrices
     
     print("\nProcessing standard matrices...")
@@ -61,5 +75,8 @@ def run_standard_visualization(max_step=7, colors=None):
         matrix_map=matrix_map,
         color=colors['transformed'],
         output_folder="Spanning_standard",
-        title_prefix="(Standard matrices)"
+        inverses=inverse_labels if reduced else None,
+        exact=exact,
+        title_prefix="(Standard matrices)",
+        **plot_options
     ) 
\ No newline at end of file
@@ -0,0 +1,844 @@
+"""
+Compute core: word enumeration and batched application of the matrices.
+
+Everything here works on NumPy arrays only and never imports matplotlib, so
+batch jobs and worker processes that only need triangles, products or
+metrics start quickly. shared_utils builds the plotting on top of it.
+
+The generators are quiet: their per-step statistics go to the counters of
+instrument_utils (and to the optional statistics lists they accept), and
+progress is printed by the renderers consuming them.
+"""
+from itertools import groupby, product
+import multiprocessing
+import os
+import numpy as np
+from src.utils.coverage_utils import add_triangles, finish_step, format_stats, should_stop
+from src.utils.exact_utils import exact_expand_level, exact_level, exact_select, exact_slice, exact_to_array, integer_matrices
+from src.utils.group_utils import add_new_elements, create_element_set, element_count
+from src.utils.instrument_utils import add_count, record_step, timer
+from src.utils.product_cache_utils import DEFAULT_CACHE_FOLDER, DEFAULT_MAX_BYTES, evict_products, product_folder
+from src.utils.prune_utils import reachable_mask, region_radius, word_norm_bounds
+from src.utils.raster_utils import DEFAULT_EXTENT
+from src.utils.sample_utils import draw_letters, walk_generators
+from src.utils.store_utils import deepest_level, is_level_complete, level_fingerprint, load_level, save_level
+from src.utils.word_utils import WORD_DTYPE, check_word_length, decode_words, extend_words, root_words
+
+def unpack_sequence(sequence_str, matrix_map):
+    """Convert a string of matrix labels into a list of matrices."""
+    try:
+        return [matrix_map[char] for char in sequence_str]
+    except KeyError:
+        valid_labels = ', '.join(sorted(matrix_map.keys()))
+        print(f"Invalid sequence. Use only: {valid_labels}")
+        return None
+
+def apply_sequence(matrices, points):
+    """Apply a sequence of matrices to points (column-based coordinates)."""
+    for matrix in matrices:
+        points = np.dot(matrix, points)  # Matrix multiplication with column-based coordinates
+    return points
+
+def generate_combinations(n, labels):
+    """Generate all combinations of labels of length n."""
+    return [''.join(comb) for comb in product(labels, repeat=n)]
+
+def apply_sequence_with_cache(sequence, points, matrix_map, cache):
+    """Apply a sequence of matrices with caching."""
+    sequence_key = tuple(sequence)
+    
+    if sequence_key in cache:
+        return cache[sequence_key]
+    
+    result = points
+    for label in sequence:
+        result = np.dot(matrix_map[label], result)
+    
+    cache[sequence_key] = result
+    return result
+
+def stack_matrices(labels, matrix_map):
+    """Stack the matrices for the given labels into a single (L, 2, 2) array."""
+    return np.stack([np.asarray(matrix_map[label]) for label in labels])
+
+def inverse_positions(labels, inverses):
+    """Map each label position to the position of its inverse label.
+
+    Args:
+        labels: String of matrix labels
+        inverses: Dictionary mapping a label to the label of its inverse matrix
+
+    Returns:
+        Integer array with the index in labels of each label's inverse,
+        or -1 for labels without an inverse among labels.
+    """
+    return np.array([labels.find(inverses[label]) if label in inverses else -1 for label in labels])
+
+def reduced_mask(generators, positions):
+    """Mask out extensions that would cancel the last generator against its inverse.
+
+    Args:
+        generators: Label index of the last letter of each word in the level
+        positions: Inverse positions as returned by inverse_positions
+
+    Returns:
+        Boolean array of shape (N, L) that is False where appending the label
+        would produce a word that is not freely reduced.
+    """
+    return np.arange(len(positions))[np.newaxis] != positions[generators][:, np.newaxis]
+
+def level_sizes(max_step, labels, inverses=None):
+    """Return the number of words of each length 1..max_step, as generated by iter_steps.
+
+    With inverses, only freely reduced words are counted: the words ending
+    in each label are tracked, and a label extends every word except those
+    ending in its inverse.
+    """
+    positions = inverse_positions(labels, inverses) if inverses else np.full(len(labels), -1)
+    ending = [1] * len(labels)
+    sizes = []
+    for _ in range(max_step):
+        sizes.append(sum(ending))
+        ending = [sum(count for last, count in enumerate(ending) if positions[last] != label) for label in range(len(labels))]
+    return sizes
+
+def expansion_pairs(count, size, allowed=None):
+    """List the (parent, generator) pairs expanded from a level.
+
+    Args:
+        count: Number of entries in the level
+        size: Number of labels
+        allowed: Optional (count, size) boolean mask of the pairs to expand.
+            If None, every pair is expanded.
+
+    Returns:
+        tuple: (parents, generators) index arrays ordered by parent and then
+        label, matching the order of generate_combinations.
+    """
+    if allowed is None:
+        return np.repeat(np.arange(count), size), np.tile(np.arange(size), count)
+    return np.nonzero(allowed)
+
+def expand_level(points, matrices, allowed=None):
+    """Apply the matrices to every entry of a level in batched products.
+
+    Args:
+        points: Array of shape (N, 2, m) with the images of the previous level
+        matrices: Array of shape (L, 2, 2) with one matrix per label
+        allowed: Optional (N, L) boolean mask of the (entry, label) pairs to
+            expand. If None, every pair is expanded.
+
+    Returns:
+        tuple: (expanded, parents, generators) where expanded[k] is
+        matrices[generators[k]] applied to points[parents[k]], ordered as in
+        expansion_pairs.
+    """
+    parents, generators = expansion_pairs(len(points), len(matrices), allowed)
+    if allowed is None:
+        expanded = np.matmul(matrices[np.newaxis], points[:, np.newaxis])
+        return expanded.reshape((-1,) + points.shape[1:]), parents, generators
+    
+    # One batched product per generator over the prefixes allowed to take it
+    expanded = np.empty((len(parents),) + points.shape[1:], dtype=np.result_type(points, matrices))
+    for index, matrix in enumerate(matrices):
+        selected = generators == index
+        expanded[selected] = np.matmul(matrix, points[parents[selected]])
+    return expanded, parents, generators
+
+def prepare_generation(labels, vertices, matrix_map, inverses=None, exact=False, products=False):
+    """Collect everything needed to expand levels of the word tree.
+
+    Args:
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to use exact integer arithmetic
+        products: If True (exact mode only), always track the exact word
+            products, even for integer seeds
+
+    Returns:
+        dict: The stacked matrices, inverse positions (or None), seed, root
+        level (the empty word) and whether exact mode tracks word products
+        instead of the triangles themselves.
+    """
+    matrices = stack_matrices(labels, matrix_map)
+    seed = np.asarray(vertices)
+    root = seed[np.newaxis]
+    track_products = False
+    
+    if exact:
+        matrices = integer_matrices(matrices)
+        track_products = products or not np.array_equal(np.rint(seed), seed)
+        root = exact_level(np.eye(2)[np.newaxis] if track_products else root)
+    
+    return {
+        'labels': labels,
+        'matrices': matrices,
+        'positions': inverse_positions(labels, inverses) if inverses else None,
+        'seed': seed,
+        'root': root,
+        'exact': exact,
+        'track_products': track_products,
+    }
+
+def expand_chunk(generation, level, generators):
+    """Expand a chunk of a level by one letter.
+
+    Args:
+        generation: Dictionary returned by prepare_generation
+        level: Points of the chunk (or an exact level in exact mode)
+        generators: Label index of the last letter of each word, or None for
+            the root level
+
+    Returns:
+        tuple: (level, parents, generators) for the expanded chunk.
+    """
+    matrices, positions = generation['matrices'], generation['positions']
+    allowed = None
+    if positions is not None and generators is not None:
+        allowed = reduced_mask(generators, positions)
+    if generation['exact']:
+        parents, generators = expansion_pairs(len(level[0]), len(matrices), allowed)
+        return exact_expand_level(level, matrices, parents, generators), parents, generators
+    return expand_level(level, matrices, allowed)
+
+def level_triangles(generation, level):
+    """Turn an expanded level (or chunk) into its triangles."""
+    if not generation['exact']:
+        return level
+    triangles = exact_to_array(level)
+    if generation['track_products']:
+        triangles = np.matmul(triangles.astype(float), generation['seed'])
+    return triangles
+
+def iter_steps(max_step, labels, vertices, matrix_map, cache, inverses=None, exact=False, store_folder=None):
+    """Generate transformations step by step.
+
+    Each level is kept as one contiguous (N, 2, 3) array and the next level is
+    obtained from it with batched products, so step n only costs
+    O(|labels|^n) vectorized work. If a cache is given, completed levels are
+    kept in it, under the fingerprint of the labels, matrices, seed,
+    reduction and mode, and reused by later calls sharing the same cache.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        cache: Dictionary of previously generated levels, or None to not
+            memoize them (each level is then freed once the next is built)
+        inverses: Optional dictionary mapping labels to their inverse labels.
+            If given, only freely reduced words are generated (no label is
+            followed by its inverse).
+        exact: If True, use exact integer arithmetic (see exact_utils). The
+            matrix map must hold integer matrices. Integer seeds are
+            transformed exactly; other seeds are multiplied by the exact word
+            products once at the end.
+        store_folder: Optional folder in which every completed level is
+            persisted (see store_utils). Levels already stored there by a run
+            with the same settings are reused, and generation resumes from
+            the deepest of them. Triangles and step_labels are then returned
+            as read-only memory maps.
+
+    Yields:
+        tuple: (step, triangles, step_labels), where triangles is an
+        (N, 2, 3) array aligned with the words in step_labels, packed as
+        uint64 codes (see word_utils.decode_words). A level is only
+        generated when the previous one has been consumed.
+    """
+    check_word_length(max_step, len(labels))
+    generation = prepare_generation(labels, vertices, matrix_map, inverses, exact)
+    current_level = generation['root']
+    current_labels = root_words()
+    generators = None
+    
+    fingerprint = level_fingerprint(labels, generation['matrices'], generation['seed'], generation['positions'], exact)
+    resume_step = 0
+    if store_folder is not None:
+        resume_step = deepest_level(store_folder, fingerprint, max_step)
+    
+    for step in range(1, max_step + 1):
+        if step <= resume_step:
+            with timer('generate.load', step=step):
+                stored = load_level(store_folder, step, exact=exact)
+            current_level, generators, current_labels = stored['state'], stored['generators'], stored['words']
+            add_count('levels_resumed', step=step)
+            yield step, stored['triangles'], current_labels
+            continue
+        
+        key = (fingerprint, step)
+        if cache is not None and key in cache:
+            add_count('cache_hits', step=step)
+            expanded = cache[key]
+        else:
+            with timer('generate.products', step=step):
+                expanded = expand_chunk(generation, current_level, generators)
+            if cache is not None:
+                add_count('cache_misses', step=step)
+                cache[key] = expanded
+        current_level, parents, generators = expanded
+        with timer('generate.triangles', step=step):
+            triangles = level_triangles(generation, current_level)
+        add_count('triangles_generated', len(triangles), step=step)
+        
+        with timer('generate.labels', step=step):
+            current_labels = extend_words(current_labels, parents, generators, len(labels))
+        if store_folder is not None:
+            with timer('generate.store', step=step):
+                triangles, current_labels = save_level(
+                    store_folder, step, fingerprint, triangles, current_labels, generators,
+                    exact_state=current_level if exact else None
+                )
+        
+        yield step, triangles, current_labels
+
+def generate_steps(max_step, labels, vertices, matrix_map, cache, inverses=None, exact=False, store_folder=None):
+    """Generate transformations for all steps (see iter_steps for the arguments).
+
+    Returns:
+        list: (step, triangles, step_labels) tuples, where triangles is an
+        (N, 2, 3) array aligned with the packed words in step_labels.
+    """
+    return list(iter_steps(max_step, labels, vertices, matrix_map, cache, inverses, exact, store_folder))
+
+def cached_product_folder(labels, matrix_map, cache_folder=DEFAULT_CACHE_FOLDER, inverses=None, exact=False):
+    """Return the folder of the product cache holding the word products of these generators."""
+    generation = prepare_generation(labels, np.eye(2, dtype=np.int64), matrix_map, inverses, exact)
+    fingerprint = level_fingerprint(labels, generation['matrices'], generation['seed'], generation['positions'], exact)
+    return product_folder(cache_folder, fingerprint)
+
+def iter_cached_steps(max_step, labels, vertices, matrix_map, cache_folder=DEFAULT_CACHE_FOLDER, inverses=None, exact=False, max_bytes=DEFAULT_MAX_BYTES):
+    """Generate transformations from word products cached on disk across runs.
+
+    The word products are generated with iter_steps and the identity as seed,
+    persisted in the product cache (see product_cache_utils) and reused by any
+    later run with the same labels, matrices, reduction and mode, whatever its
+    seed. Each level of triangles is obtained with one batched float64
+    product, as in generate_seed_steps.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        cache_folder: Folder of the product cache
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to compute the word products exactly
+        max_bytes: Size bound of the product cache, enforced once the
+            generator is exhausted or closed
+
+    Yields:
+        tuple: (step, triangles, step_labels) as iter_steps with a store
+        folder.
+    """
+    folder = cached_product_folder(labels, matrix_map, cache_folder, inverses, exact)
+    seed = np.asarray(vertices, dtype=float)
+    identity = np.eye(2, dtype=np.int64)
+    try:
+        for step, products, step_labels in iter_steps(
+            max_step, labels, identity, matrix_map, None, inverses=inverses, exact=exact, store_folder=folder
+        ):
+            with timer('generate.triangles', step=step):
+                triangles = np.matmul(np.asarray(products, dtype=float), seed)
+            yield step, triangles, step_labels
+    finally:
+        evict_products(cache_folder, max_bytes, keep=folder)
+
+def iter_group_steps(max_step, labels, vertices, matrix_map, inverses=None, growth=None):
+    """Generate the triangles of distinct group elements, breadth-first.
+
+    Words are expanded level by level as in iter_steps, but with their exact
+    products tracked in an element set (see group_utils): a word whose matrix
+    was already reached by a shorter or earlier word is dropped together with
+    all its extensions. Each matrix is therefore transformed, stored and
+    drawn once, labelled by its first word in generation order.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to integer matrices (inverses
+            computed with np.linalg.inv are rounded)
+        inverses: Optional dictionary mapping labels to their inverse labels,
+            to skip the words that trivially cancel before hashing them
+        growth: Optional list to which the statistics of each level are
+            appended: 'step', 'words' (words formed from the kept words of
+            the previous level), 'elements' (new distinct elements) and
+            'total' (distinct elements so far, the identity included)
+
+    Yields:
+        tuple: (step, triangles, step_labels) for the new elements only.
+    """
+    matrix_map = {label: integer_matrices(np.asarray(matrix_map[label]), tolerance=1e-9) for label in labels}
+    check_word_length(max_step, len(labels))
+    generation = prepare_generation(labels, vertices, matrix_map, inverses, exact=True, products=True)
+    current_level = generation['root']
+    current_labels = root_words()
+    generators = None
+    elements = create_element_set(current_level)
+    
+    for step in range(1, max_step + 1):
+        with timer('generate.products', step=step):
+            current_level, parents, generators = expand_chunk(generation, current_level, generators)
+        with timer('generate.dedup', step=step):
+            new = add_new_elements(elements, current_level)
+        words = len(parents)
+        current_level, parents, generators = exact_select(current_level, new), parents[new], generators[new]
+        with timer('generate.labels', step=step):
+            current_labels = extend_words(current_labels, parents, generators, len(labels))
+        add_count('duplicates_dropped', words - len(parents), step=step)
+        
+        stats = {'step': step, 'words': words, 'elements': len(parents), 'total': element_count(elements)}
+        if growth is not None:
+            growth.append(stats)
+        
+        with timer('generate.triangles', step=step):
+            triangles = level_triangles(generation, current_level)
+        add_count('triangles_generated', len(triangles), step=step)
+        yield step, triangles, current_labels
+        if not len(parents):
+            break
+
+def group_growth(max_step, labels, matrix_map, inverses=None):
+    """Return the per-level statistics of iter_group_steps (the growth function of the group)."""
+    growth = []
+    for _ in iter_group_steps(max_step, labels, np.eye(2), matrix_map, inverses=inverses, growth=growth):
+        pass
+    return growth
+
+def iter_pruned_steps(max_step, labels, vertices, matrix_map, region=DEFAULT_EXTENT, inverses=None, exact=False, pruning=None):
+    """Generate transformations, pruning the branches that cannot reach a region.
+
+    Levels are expanded as in iter_steps, but after each step the words
+    whose triangle is provably too far from the origin to come back into
+    region within the remaining max_step - step letters are dropped with all
+    their extensions (see prune_utils). Every triangle meeting the region is
+    still generated; the pruned ones lie entirely outside it.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        region: (xmin, xmax, ymin, ymax) box of interest
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to use exact integer arithmetic
+        pruning: Optional list to which the statistics of each level are
+            appended: 'step', 'words' (words formed), 'pruned' and 'kept'
+
+    Yields:
+        tuple: (step, triangles, step_labels) for the kept words only.
+    """
+    check_word_length(max_step, len(labels))
+    generation = prepare_generation(labels, vertices, matrix_map, inverses, exact)
+    radius = region_radius(region)
+    norm_bounds = word_norm_bounds(generation['matrices'], max_step)
+    current_level = generation['root']
+    current_labels = root_words()
+    generators = None
+    
+    for step in range(1, max_step + 1):
+        with timer('generate.products', step=step):
+            current_level, parents, generators = expand_chunk(generation, current_level, generators)
+        with timer('generate.triangles', step=step):
+            triangles = level_triangles(generation, current_level)
+        with timer('generate.prune', step=step):
+            kept = reachable_mask(triangles, radius, norm_bounds[max_step - step])
+        words = len(parents)
+        
+        if not kept.all():
+            current_level = exact_select(current_level, kept) if exact else current_level[kept]
+            triangles, parents, generators = triangles[kept], parents[kept], generators[kept]
+        with timer('generate.labels', step=step):
+            current_labels = extend_words(current_labels, parents, generators, len(labels))
+        
+        stats = {'step': step, 'words': words, 'pruned': words - len(parents), 'kept': len(parents)}
+        add_count('branches_pruned', stats['pruned'], step=step)
+        add_count('triangles_generated', len(triangles), step=step)
+        if pruning is not None:
+            pruning.append(stats)
+        
+        yield step, triangles, current_labels
+        if not len(parents):
+            break
+
+def iter_sampled_steps(max_step, labels, vertices, matrix_map, samples=100000, seed=0, chunk_size=65536, with_labels=False, inverses=None):
+    """Follow seeded random walks over the generators instead of every word.
+
+    Each of the samples walks appends one random letter per step (see
+    sample_utils), so step n costs a fixed samples batched products whatever
+    the size of the level, and the walks of step n are a uniform sample of
+    its words (of its freely reduced words if inverses is given): counts
+    accumulated from them estimate the density of the full level scaled by
+    samples / level size. The triangles are computed in float64; walks whose
+    triangle overflows to infinity are far outside any window and are
+    dropped.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        samples: Number of walks (the sample budget)
+        seed: Seed of the walks; the same (seed, samples, chunk_size) always
+            gives the same walks
+        chunk_size: Maximum number of walks advanced and yielded at once
+        with_labels: Whether to also yield the packed words of each chunk,
+            which limits max_step to word_utils.max_word_length
+        inverses: Optional dictionary mapping labels to their inverse labels
+
+    Yields:
+        tuple: (step, triangles, chunk_labels) per chunk of walks, in step
+        order, with chunk_labels None if with_labels is False.
+    """
+    if with_labels:
+        check_word_length(max_step, len(labels))
+    generation = prepare_generation(labels, vertices, matrix_map, inverses)
+    matrices = np.asarray(generation['matrices'], dtype=float)
+    seed_triangle = np.asarray(vertices, dtype=float)
+    chunks = [
+        {'rng': rng, 'triangles': np.broadcast_to(seed_triangle, (count, 2, 3)), 'letters': count, 'words': root_words().repeat(count) if with_labels else None}
+        for count, rng in walk_generators(seed, samples, chunk_size)
+    ]
+    
+    for step in range(1, max_step + 1):
+        for chunk in chunks:
+            with timer('generate.products', step=step):
+                letters = draw_letters(chunk['rng'], chunk['letters'], len(labels), generation['positions'])
+                with np.errstate(over='ignore', invalid='ignore'):
+                    triangles = np.matmul(matrices[letters], chunk['triangles'])
+                finite = np.isfinite(triangles).all(axis=(1, 2))
+                if not finite.all():
+                    add_count('walks_dropped', np.count_nonzero(~finite), step=step)
+                    triangles, letters = triangles[finite], letters[finite]
+                    if with_labels:
+                        chunk['words'] = chunk['words'][finite]
+            if with_labels:
+                with timer('generate.labels', step=step):
+                    chunk['words'] = chunk['words'] * WORD_DTYPE(len(labels)) + letters.astype(WORD_DTYPE)
+            chunk['triangles'], chunk['letters'] = triangles, letters
+            add_count('triangles_generated', len(triangles), step=step)
+            yield step, triangles, chunk['words']
+
+def expand_shard(shard):
+    """Expand the subtree of one prefix word into its shard folder (process pool worker).
+
+    Every level of the subtree, down to max_step, is persisted with
+    save_level. Levels already complete in the shard folder are kept, so a
+    shard that failed resumes from the deepest of them.
+
+    Args:
+        shard: Dictionary built by iter_sharded_steps with the generation
+            arguments, the prefix word, its level entry and last generator,
+            and the shard folder and fingerprint.
+
+    Returns:
+        int: The index of the shard.
+    """
+    generation = prepare_generation(
+        shard['labels'], shard['vertices'], shard['matrix_map'], shard['inverses'], shard['exact']
+    )
+    folder, fingerprint = shard['folder'], shard['fingerprint']
+    level, generators, words = shard['level'], shard['generators'], np.array([shard['prefix']], dtype=WORD_DTYPE)
+    
+    done = shard['prefix_length']
+    while done < shard['max_step'] and is_level_complete(folder, done + 1, fingerprint):
+        done += 1
+    if done > shard['prefix_length']:
+        stored = load_level(folder, done, exact=shard['exact'])
+        level, generators, words = stored['state'], stored['generators'], stored['words']
+    
+    for step in range(done + 1, shard['max_step'] + 1):
+        level, parents, generators = expand_chunk(generation, level, generators)
+        words = extend_words(words, parents, generators, len(shard['labels']))
+        save_level(
+            folder, step, fingerprint, level_triangles(generation, level), words, generators,
+            exact_state=level if shard['exact'] else None
+        )
+    return shard['index']
+
+def iter_sharded_steps(max_step, labels, vertices, matrix_map, folder, prefix_length=2, processes=None, retries=2, inverses=None, exact=False):
+    """Generate transformations in parallel, one shard per prefix word.
+
+    The levels up to prefix_length are generated here; every word of length
+    prefix_length then roots an independent shard whose subtree is expanded
+    by expand_shard on a process pool, with batched products, into its own
+    folder under folder. Shards that raise are retried up to retries times,
+    and a later run with the same settings skips the complete shards and
+    resumes the others, so a failed worker never restarts the whole job.
+
+    The levels are ordered parent first, so the descendants of each prefix
+    form one contiguous block of every deeper level: yielding the shards in
+    prefix order reproduces the level of iter_steps exactly.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        folder: Folder holding the shard folders
+        prefix_length: Word length at which the tree is split into shards
+            (at least 1)
+        processes: Number of worker processes (defaults to os.cpu_count())
+        retries: Number of times the failed shards are submitted again
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to use exact integer arithmetic
+
+    Yields:
+        tuple: (step, triangles, step_labels). Steps up to prefix_length come
+        whole, as from iter_steps; deeper steps come as one chunk per shard,
+        in prefix order, read from the shard folders as memory maps.
+
+    Raises:
+        RuntimeError: If some shards still fail after the retries.
+    """
+    if prefix_length < 1:
+        raise ValueError(f"prefix_length must be at least 1, got {prefix_length}")
+    check_word_length(max_step, len(labels))
+    generation = prepare_generation(labels, vertices, matrix_map, inverses, exact)
+    fingerprint = level_fingerprint(labels, generation['matrices'], generation['seed'], generation['positions'], exact)
+    prefix_length = min(prefix_length, max_step)
+    current_level = generation['root']
+    current_labels = root_words()
+    generators = None
+    
+    for step in range(1, prefix_length + 1):
+        with timer('generate.products', step=step):
+            current_level, parents, generators = expand_chunk(generation, current_level, generators)
+        with timer('generate.triangles', step=step):
+            triangles = level_triangles(generation, current_level)
+        with timer('generate.labels', step=step):
+            current_labels = extend_words(current_labels, parents, generators, len(labels))
+        add_count('triangles_generated', len(triangles), step=step)
+        yield step, triangles, current_labels
+    if prefix_length == max_step:
+        return
+    
+    # Shards are named after their prefix word, so runs with another
+    # prefix_length never pick up each other's levels
+    prefixes = decode_words(current_labels, prefix_length, labels)
+    shards = [{
+        'index': index,
+        'labels': labels,
+        'vertices': vertices,
+        'matrix_map': matrix_map,
+        'inverses': inverses,
+        'exact': exact,
+        'max_step': max_step,
+        'prefix_length': prefix_length,
+        'prefix': prefix,
+        'level': exact_slice(current_level, index, index + 1) if exact else current_level[index:index + 1],
+        'generators': generators[index:index + 1],
+        'folder': os.path.join(folder, f"shard_{word}"),
+        'fingerprint': f"{fingerprint}:{word}",
+    } for index, (prefix, word) in enumerate(zip(current_labels.tolist(), prefixes))]
+    
+    pending = [shard for shard in shards if not is_level_complete(shard['folder'], max_step, shard['fingerprint'])]
+    add_count('shards_expanded', len(pending))
+    errors = {}
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        if attempt:
+            add_count('shards_retried', len(pending))
+        failed = []
+        with timer('generate.shards'), multiprocessing.Pool(processes) as pool:
+            results = [(shard, pool.apply_async(expand_shard, (shard,))) for shard in pending]
+            for shard, result in results:
+                try:
+                    result.get()
+                except Exception as error:
+                    errors[shard['index']] = error
+                    failed.append(shard)
+        pending = failed
+    if pending:
+        shard = pending[0]
+        raise RuntimeError(
+            f"{len(pending)} shards failed after {retries + 1} attempts, rerun to resume them "
+            f"(shard {shard['index']} ({prefixes[shard['index']]}): {errors[shard['index']]!r})"
+        )
+    
+    for step in range(prefix_length + 1, max_step + 1):
+        for shard in shards:
+            with timer('generate.load', step=step):
+                stored = load_level(shard['folder'], step)
+            add_count('triangles_generated', len(stored['triangles']), step=step)
+            yield step, stored['triangles'], stored['words']
+
+def iter_family_steps(max_step, labels, vertices, matrix_maps, inverses=None):
+    """Generate the steps of a family of matrix maps sharing the same labels at once.
+
+    The word tree only depends on the labels and the reduction, so the
+    (parent, generator) pairs of each level are computed once and every map
+    of the family is expanded in the same batched products, with the family
+    as an extra leading axis. Triangles are computed in float64.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_maps: Sequence of dictionaries mapping labels to matrices
+        inverses: Optional dictionary mapping labels to their inverse labels
+
+    Yields:
+        tuple: (step, triangles, step_labels), where triangles has shape
+        (K, N, 2, 3) with triangles[j] the level of matrix_maps[j], and
+        step_labels the N packed words shared by the whole family.
+    """
+    check_word_length(max_step, len(labels))
+    matrices = np.stack([stack_matrices(labels, matrix_map) for matrix_map in matrix_maps]).astype(float)
+    positions = inverse_positions(labels, inverses) if inverses else None
+    current_level = np.broadcast_to(np.asarray(vertices, dtype=float), (len(matrices), 1, 2, 3))
+    current_labels = root_words()
+    generators = None
+    
+    for step in range(1, max_step + 1):
+        allowed = None
+        if positions is not None and generators is not None:
+            allowed = reduced_mask(generators, positions)
+        parents, generators = expansion_pairs(current_level.shape[1], len(labels), allowed)
+        
+        # One batched product per generator over the whole family
+        with timer('generate.products', step=step):
+            expanded = np.empty((len(matrices), len(parents), 2, 3))
+            for index in range(len(labels)):
+                selected = generators == index
+                expanded[:, selected] = np.matmul(matrices[:, index, np.newaxis], current_level[:, parents[selected]])
+        current_level = expanded
+        with timer('generate.labels', step=step):
+            current_labels = extend_words(current_labels, parents, generators, len(labels))
+        add_count('triangles_generated', current_level.shape[0] * current_level.shape[1], step=step)
+        yield step, current_level, current_labels
+
+def iter_step_chunks(max_step, labels, vertices, matrix_map, chunk_size=65536, with_labels=False, inverses=None, exact=False):
+    """Stream the triangles of every step in chunks of at most chunk_size.
+
+    Unlike generate_steps, no level is ever held in full: the chunks of step n
+    are obtained by expanding the chunks of step n - 1 one at a time, so memory
+    stays bounded by the chunk size and max_step, at the price of recomputing
+    the (much smaller) shallower levels for every step.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        chunk_size: Maximum number of triangles per chunk
+        with_labels: Whether to also yield the packed words of each chunk
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to use exact integer arithmetic
+
+    Yields:
+        tuple: (step, triangles, chunk_labels) where triangles is an
+        (n, 2, 3) array and chunk_labels the matching words, or None if
+        with_labels is False. Chunks come in the same order as generate_steps.
+    """
+    if with_labels:
+        check_word_length(max_step, len(labels))
+    generation = prepare_generation(labels, vertices, matrix_map, inverses, exact)
+    
+    def level_chunks(depth):
+        # Expansions are tagged with the step being streamed, not their depth
+        if depth == 0:
+            yield generation['root'], None, root_words() if with_labels else None
+            return
+        for level, generators, words in level_chunks(depth - 1):
+            with timer('generate.products', step=step):
+                level, parents, generators = expand_chunk(generation, level, generators)
+            if words is not None:
+                with timer('generate.labels', step=step):
+                    words = extend_words(words, parents, generators, len(labels))
+            for start in range(0, len(generators), chunk_size):
+                stop = start + chunk_size
+                chunk = exact_slice(level, start, stop) if exact else level[start:stop]
+                yield chunk, generators[start:stop], words[start:stop] if words is not None else None
+    
+    for step in range(1, max_step + 1):
+        for level, generators, words in level_chunks(step):
+            with timer('generate.triangles', step=step):
+                triangles = level_triangles(generation, level)
+            add_count('triangles_generated', len(triangles), step=step)
+            yield step, triangles, words
+
+def generate_seed_steps(max_step, labels, seeds, matrix_map, cache, inverses=None, exact=False, product_cache=None):
+    """Generate the steps of several seed triangles from shared word products.
+
+    The 2x2 word products of each level are generated once, with generate_steps
+    and the identity as seed, and applied to all seeds in one batched product.
+    In exact mode the products are exact and the triangles are obtained from
+    them with a single float64 product.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        seeds: Sequence of seed triangles (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        cache: Dictionary of previously generated levels, or None
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to compute the word products exactly
+        product_cache: Optional product cache folder (see iter_cached_steps)
+            from which the products are reused across runs
+
+    Returns:
+        list: For each seed, the list of (step, triangles, step_labels)
+        tuples that generate_steps would return for it. The labels are
+        shared between seeds.
+    """
+    seed_stack = np.stack([np.asarray(seed, dtype=float) for seed in seeds])
+    seed_steps = [[] for _ in seeds]
+    
+    identity = np.eye(2, dtype=np.int64)
+    store_folder = None
+    if product_cache is not None:
+        store_folder = cached_product_folder(labels, matrix_map, product_cache, inverses, exact)
+    all_products = generate_steps(max_step, labels, identity, matrix_map, cache, inverses, exact, store_folder=store_folder)
+    if product_cache is not None:
+        evict_products(product_cache, keep=store_folder)
+    
+    for step, products, step_labels in all_products:
+        # (seeds, words, 2, 3) in one batched product
+        triangles = np.matmul(np.asarray(products, dtype=float)[np.newaxis], seed_stack[:, np.newaxis])
+        for steps, seed_triangles in zip(seed_steps, triangles):
+            steps.append((step, seed_triangles, step_labels))
+    
+    return seed_steps
+
+def measure_coverage(max_step, labels, vertices, matrix_map, coverage, inverses=None, exact=False, chunk_size=None, verbose=False):
+    """Track the coverage of the window step by step without rendering anything.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        coverage: Coverage from coverage_utils.create_coverage; generation
+            stops early once it meets its stopping settings
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to use exact integer arithmetic
+        chunk_size: If given, stream the triangles with iter_step_chunks
+        verbose: If True, print the statistics of every step
+
+    Returns:
+        list: The per-step statistics recorded in coverage['history'].
+    """
+    if chunk_size is None:
+        chunks = iter_steps(max_step, labels, vertices, matrix_map, None, inverses=inverses, exact=exact)
+    else:
+        chunks = iter_step_chunks(
+            max_step, labels, vertices, matrix_map, chunk_size=chunk_size, inverses=inverses, exact=exact
+        )
+    
+    for step, step_chunks in groupby(chunks, key=lambda chunk: chunk[0]):
+        for _, triangles, _ in step_chunks:
+            with timer('coverage.update'):
+                add_triangles(coverage, triangles)
+        with timer('coverage.stats'):
+            stats = finish_step(coverage, step)
+        if verbose:
+            print(format_stats(stats))
+        record_step(step)
+        if should_stop(coverage):
+            break
+    
+    return coverage['history']
@@ -0,0 +1,135 @@
+"""
+Render-free coverage metrics of the orbit over the plotting window.
+
+A coverage is a dictionary holding a bitset occupancy grid (one bit per cell
+of a resolution x resolution grid over the window, packed with np.packbits),
+the early-stopping settings and the per-step history of statistics. Triangles
+are rasterized with raster_utils and OR-ed into the bitset chunk by chunk.
+"""
+import numpy as np
+from src.utils.raster_utils import DEFAULT_EXTENT, create_density_grid, grid_counts, rasterize_triangles
+
+# Number of set bits of every byte value
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.int64)
+
+def create_coverage(resolution=512, extent=DEFAULT_EXTENT, threshold=None, patience=None, min_new_cells=0):
+    """Create an empty coverage.
+
+    Args:
+        resolution: Number of cells along each axis
+        extent: (xmin, xmax, ymin, ymax) of the window
+        threshold: Stop once this fraction of the cells is covered
+        patience: Stop once this many consecutive steps covered at most
+            min_new_cells new cells each
+        min_new_cells: See patience
+
+    Returns:
+        dict: The coverage, to pass to add_triangles and finish_step.
+    """
+    return {
+        'resolution': resolution,
+        'extent': extent,
+        'bits': np.zeros((resolution * resolution + 7) // 8, dtype=np.uint8),
+        'covered': 0,
+        'threshold': threshold,
+        'patience': patience,
+        'min_new_cells': min_new_cells,
+        'history': [],
+    }
+
+def covered_cells(coverage):
+    """Return the occupancy grid of a coverage as a 2D boolean array (row 0 at the top)."""
+    resolution = coverage['resolution']
+    cells = np.unpackbits(coverage['bits'], count=resolution * resolution)
+    return cells.reshape(resolution, resolution).astype(bool)
+
+def add_triangles(coverage, triangles):
+    """Mark the cells covered by a chunk of (N, 2, 3) triangles."""
+    grid = create_density_grid(coverage['resolution'])
+    rasterize_triangles(triangles, grid, coverage['extent'])
+    add_counts(coverage, grid_counts(grid))
+
+def add_counts(coverage, counts):
+    """Mark the cells with a non-zero hit count, from counts rasterized over the same grid."""
+    coverage['bits'] |= np.packbits(counts > 0)
+
+def uncovered_regions(covered):
+    """Return the sizes of the 4-connected regions of uncovered cells.
+
+    Regions are found row by row from runs of uncovered cells, merging runs
+    that overlap a run of the previous row with a union-find.
+    """
+    parent = []
+    sizes = []
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    previous = []
+    for row in ~covered:
+        edges = np.diff(np.concatenate(([0], row.view(np.int8), [0])))
+        current = []
+        index = 0
+        for start, stop in zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()):
+            node = len(parent)
+            parent.append(node)
+            sizes.append(stop - start)
+            # Skip the runs of the previous row that end before this one starts
+            while index < len(previous) and previous[index][1] <= start:
+                index += 1
+            overlap = index
+            while overlap < len(previous) and previous[overlap][0] < stop:
+                root, other = find(node), find(previous[overlap][2])
+                if root != other:
+                    parent[other] = root
+                    sizes[root] += sizes[other]
+                overlap += 1
+            current.append((start, stop, node))
+        previous = current
+
+    return np.array(sorted((sizes[node] for node in range(len(parent)) if parent[node] == node), reverse=True), dtype=np.int64)
+
+def finish_step(coverage, step):
+    """Record the statistics of a completed step.
+
+    Returns:
+        dict: 'step', 'covered_fraction', 'new_cells', 'uncovered_regions'
+        (number of connected uncovered regions) and
+        'largest_uncovered_fraction' (size of the largest one over all cells).
+    """
+    total = coverage['resolution'] ** 2
+    covered = int(POPCOUNT[coverage['bits']].sum())
+    regions = uncovered_regions(covered_cells(coverage))
+    stats = {
+        'step': step,
+        'covered_fraction': covered / total,
+        'new_cells': covered - coverage['covered'],
+        'uncovered_regions': len(regions),
+        'largest_uncovered_fraction': int(regions[0]) / total if len(regions) else 0.0,
+    }
+    coverage['covered'] = covered
+    coverage['history'].append(stats)
+    return stats
+
+def should_stop(coverage):
+    """Check the early-stopping settings against the recorded history."""
+    history = coverage['history']
+    if not history:
+        return False
+    if coverage['threshold'] is not None and history[-1]['covered_fraction'] >= coverage['threshold']:
+        return True
+    patience = coverage['patience']
+    if patience is not None and len(history) >= patience:
+        return all(stats['new_cells'] <= coverage['min_new_cells'] for stats in history[-patience:])
+    return False
+
+def format_stats(stats):
+    """Format the statistics of a step for printing."""
+    return (
+        f"Coverage {stats['covered_fraction']:.2%} (+{stats['new_cells']} cells), "
+        f"{stats['uncovered_regions']} uncovered regions, "
+        f"largest {stats['largest_uncovered_fraction']:.2%}"
+    )
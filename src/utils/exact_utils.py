@@ -0,0 +1,96 @@
+"""
+Exact integer arithmetic for matrix maps whose generators have determinant +-1.
+
+An exact level is a tuple (points, wide, wide_points):
+- points: int64 array of shape (N, 2, m)
+- wide: boolean array of shape (N,) marking entries that no longer fit in int64
+- wide_points: object array of shape (W, 2, m) holding the Python integer values
+  of the wide entries, in order (the matching rows of points are left at zero)
+"""
+import numpy as np
+
+# Products are only computed in int64 while 2 * |matrix| * |points| stays below this
+INT64_SAFE_LIMIT = 2.0 ** 62
+
+def integer_inverse(matrix):
+    """Return the exact inverse of an integer 2x2 matrix with determinant +-1."""
+    (a, b), (c, d) = np.asarray(matrix).tolist()
+    determinant = a * d - b * c
+    if determinant not in (1, -1):
+        raise ValueError(f"Matrix {matrix} has determinant {determinant}, expected 1 or -1")
+    return determinant * np.array([[d, -b], [-c, a]], dtype=np.int64)
+
+def integer_matrices(matrices, tolerance=0):
+    """Convert a stack of integer-valued matrices to int64, rejecting fractional entries.
+
+    Entries within tolerance of an integer (e.g. inverses computed with
+    np.linalg.inv) are rounded; by default they must be exact integers.
+    """
+    rounded = np.rint(matrices)
+    if not np.allclose(rounded, matrices, rtol=0, atol=tolerance):
+        raise ValueError("Exact mode needs integer matrices; build the matrix map with exact=True")
+    return rounded.astype(np.int64)
+
+def exact_level(points):
+    """Wrap a stack of integer arrays as an exact level without wide entries."""
+    points = integer_matrices(np.asarray(points))
+    return points, np.zeros(len(points), dtype=bool), np.empty((0,) + points.shape[1:], dtype=object)
+
+def exact_expand_level(level, matrices, parents, generators):
+    """Exactly apply matrices[generators[k]] to entry parents[k] of the level.
+
+    Entries are multiplied in int64 (one batched product per generator) as long
+    as the result is guaranteed to fit; only the branches that would overflow,
+    and their descendants, are computed with arbitrary-precision integers.
+
+    Args:
+        level: Exact level (points, wide, wide_points)
+        matrices: int64 array of shape (L, 2, 2)
+        parents: Index into the level of each new entry
+        generators: Index into matrices of each new entry
+
+    Returns:
+        tuple: The new exact level.
+    """
+    points, wide, wide_points = level
+    shape = points.shape[1:]
+    bounds = np.abs(matrices).max(axis=(1, 2)).astype(float)
+    magnitudes = np.abs(points).max(axis=(1, 2)).astype(float)
+    safe = ~wide[parents] & (2.0 * bounds[generators] * magnitudes[parents] < INT64_SAFE_LIMIT)
+
+    expanded = np.zeros((len(parents),) + shape, dtype=np.int64)
+    for index, matrix in enumerate(matrices):
+        selected = safe & (generators == index)
+        expanded[selected] = np.matmul(matrix, points[parents[selected]])
+
+    # Arbitrary precision only for the branches that overflow or already did
+    new_wide = ~safe
+    wide_parents = parents[new_wide]
+    from_wide = wide[wide_parents]
+    sources = np.empty((len(wide_parents),) + shape, dtype=object)
+    sources[~from_wide] = points[wide_parents[~from_wide]].astype(object)
+    wide_rank = np.cumsum(wide) - 1
+    sources[from_wide] = wide_points[wide_rank[wide_parents[from_wide]]]
+    new_wide_points = np.matmul(matrices.astype(object)[generators[new_wide]], sources)
+
+    return expanded, new_wide, new_wide_points.reshape((-1,) + shape)
+
+def exact_slice(level, start, stop):
+    """Return entries start:stop of an exact level as a new exact level."""
+    points, wide, wide_points = level
+    first, last = np.count_nonzero(wide[:start]), np.count_nonzero(wide[:stop])
+    return points[start:stop], wide[start:stop], wide_points[first:last]
+
+def exact_select(level, mask):
+    """Return the entries of an exact level selected by a boolean mask."""
+    points, wide, wide_points = level
+    return points[mask], wide[mask], wide_points[mask[wide]]
+
+def exact_to_array(level):
+    """Merge an exact level into one array (int64, or object if any entry is wide)."""
+    points, wide, wide_points = level
+    if not wide.any():
+        return points
+    merged = points.astype(object)
+    merged[wide] = wide_points
+    return merged
@@ -0,0 +1,58 @@
+"""
+Deduplication of group elements reached by several words.
+
+Words are enumerated breadth-first over the Cayley graph, tracking the exact
+product of each word (see exact_utils). An element set remembers every matrix
+seen so far: the products that fit in int64 as one sorted key set (see
+key_utils), and the few that do not as tuples of Python integers. Only the
+words reaching a new matrix are kept and expanded further, so the number kept
+per level is the growth function of the group with respect to the generators.
+"""
+import numpy as np
+from src.utils.key_utils import insert_keys, key_dtype, pack_keys
+
+INT64_RANGE = np.iinfo(np.int64)
+
+def create_element_set(level):
+    """Create an element set holding the entries of an exact level (e.g. the identity)."""
+    elements = {'keys': np.empty(0, dtype=key_dtype(4)), 'wide': set()}
+    add_new_elements(elements, level)
+    return elements
+
+def add_new_elements(elements, level):
+    """Add the products of an exact level to an element set.
+
+    Args:
+        elements: Element set from create_element_set, updated in place
+        level: Exact level (points, wide, wide_points) of word products
+
+    Returns:
+        Boolean array marking the entries that were not in the set, keeping
+        only the first entry of each matrix repeated within the level.
+    """
+    points, wide, wide_points = level
+    new = np.zeros(len(points), dtype=bool)
+
+    # The wide flag is conservative: products that still fit in int64 are
+    # keyed as narrow ones, so each matrix has a single key
+    fits = ((wide_points >= INT64_RANGE.min) & (wide_points <= INT64_RANGE.max)).all(axis=tuple(range(1, wide_points.ndim)))
+    wide_entries = np.flatnonzero(wide)
+    narrow = np.concatenate([np.flatnonzero(~wide), wide_entries[fits]])
+    narrow_points = np.concatenate([points[~wide], wide_points[fits].astype(np.int64)])
+    order = np.argsort(narrow, kind='stable')
+    narrow, narrow_points = narrow[order], narrow_points[order]
+
+    narrow_new, elements['keys'] = insert_keys(elements['keys'], pack_keys(narrow_points))
+    new[narrow[narrow_new]] = True
+
+    for entry, product in zip(wide_entries[~fits].tolist(), wide_points[~fits]):
+        key = tuple(product.ravel().tolist())
+        if key not in elements['wide']:
+            elements['wide'].add(key)
+            new[entry] = True
+
+    return new
+
+def element_count(elements):
+    """Return the number of distinct elements in an element set."""
+    return len(elements['keys']) + len(elements['wide'])
@@ -0,0 +1,197 @@
+"""
+Uniform-grid spatial index over generated triangles for point and box queries.
+
+The window is split into cells x cells square cells. Each step added to the
+index keeps its (N, 2, 3) triangles and words as given (packed word arrays,
+possibly the read-only memory maps of a store, or lists of strings) plus a compressed cell list: the indices of
+the triangles whose bounding box meets each cell, sorted by cell, with the
+offset of every cell's run. Triangles whose bounding box spans more than
+MAX_CELLS_PER_TRIANGLE cells (typically long slivers through the origin,
+since the maps are linear) are kept in a separate list checked by every
+query, with their edge equations and bounds precomputed so that checking
+them is a few vectorized operations. Triangles outside the window are assigned to the border cells, so
+queries outside the window still give exact answers.
+
+A query collects the candidates of the cells it touches and runs an exact
+point-in-triangle or triangle/box overlap test on them only.
+"""
+import os
+import numpy as np
+from src.utils.instrument_utils import add_count
+from src.utils.raster_utils import DEFAULT_EXTENT
+from src.utils.store_utils import load_level
+from src.utils.word_utils import WORD_DTYPE, decode_words
+
+# Triangles covering more cells than this are not listed per cell
+MAX_CELLS_PER_TRIANGLE = 64
+
+def create_index(cells=256, extent=DEFAULT_EXTENT, labels=None):
+    """Create an empty index.
+
+    Args:
+        cells: Number of cells along each axis
+        extent: (xmin, xmax, ymin, ymax) of the window split into cells
+        labels: String of matrix labels used to decode packed words in query
+            results; if None, packed words are returned as integer codes
+
+    Returns:
+        dict: The index, to fill with add_step.
+    """
+    return {'cells': cells, 'extent': extent, 'labels': labels, 'steps': []}
+
+def _cell_coordinates(index, x, y):
+    """Map x and y coordinates to (column, row) cell indices clipped to the grid."""
+    cells = index['cells']
+    xmin, xmax, ymin, ymax = index['extent']
+    column = np.floor((np.asarray(x, dtype=float) - xmin) * (cells / (xmax - xmin)))
+    row = np.floor((np.asarray(y, dtype=float) - ymin) * (cells / (ymax - ymin)))
+    return (
+        np.clip(column, 0, cells - 1).astype(np.int64),
+        np.clip(row, 0, cells - 1).astype(np.int64),
+    )
+
+def _halfplanes(triangles):
+    """Return (a, b, c) of shape (N, 3) such that a*x + b*y + c >= 0 inside each edge."""
+    x, y = triangles[:, 0], triangles[:, 1]
+    next_x, next_y = np.roll(x, -1, axis=1), np.roll(y, -1, axis=1)
+    a, b = y - next_y, next_x - x
+    c = -(a * x + b * y)
+    # Orient the edges of clockwise triangles inwards as well
+    orientation = np.where(np.sum(x * next_y - next_x * y, axis=1) < 0, -1.0, 1.0)[:, np.newaxis]
+    return a * orientation, b * orientation, c * orientation
+
+def _bounds(triangles):
+    """Return the (xmin, xmax, ymin, ymax) bounding boxes of (N, 2, 3) triangles."""
+    return (
+        triangles[:, 0].min(axis=1), triangles[:, 0].max(axis=1),
+        triangles[:, 1].min(axis=1), triangles[:, 1].max(axis=1),
+    )
+
+def add_step(index, step, triangles, words):
+    """Index the triangles of one step.
+
+    Args:
+        index: Index from create_index, updated in place
+        step: Word length of the triangles
+        triangles: (N, 2, 3) array of triangles, possibly a memory map
+        words: Words aligned with triangles (packed words or strings)
+    """
+    cells = index['cells']
+    points = np.asarray(triangles, dtype=float)
+    xmin, xmax, ymin, ymax = _bounds(points)
+    first_column, first_row = _cell_coordinates(index, xmin, ymin)
+    last_column, last_row = _cell_coordinates(index, xmax, ymax)
+    width = last_column - first_column + 1
+    counts = width * (last_row - first_row + 1)
+    large = counts > MAX_CELLS_PER_TRIANGLE
+    counts[large] = 0
+
+    # One (cell, triangle) entry per cell met by each bounding box
+    owners = np.repeat(np.arange(len(points)), counts)
+    local = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_ids = (first_row[owners] + local // width[owners]) * cells + first_column[owners] + local % width[owners]
+    order = np.argsort(cell_ids, kind='stable')
+
+    # Large triangles are tested directly, from precomputed edges and bounds
+    large_points = points[large]
+    index['steps'].append({
+        'step': step,
+        'triangles': triangles,
+        'words': words,
+        'members': owners[order],
+        'offsets': np.searchsorted(cell_ids[order], np.arange(cells * cells + 1)),
+        'large': np.flatnonzero(large),
+        'large_edges': _halfplanes(large_points),
+        'large_bounds': _bounds(large_points),
+    })
+    add_count('triangles_indexed', len(points), step=step)
+    add_count('triangles_indexed_large', int(np.count_nonzero(large)), step=step)
+
+def index_steps(steps, cells=256, extent=DEFAULT_EXTENT, labels=None):
+    """Build an index from (step, triangles, words) tuples, as produced by iter_steps."""
+    index = create_index(cells, extent, labels)
+    for step, triangles, words in steps:
+        add_step(index, step, triangles, words)
+    return index
+
+def index_store(folder, cells=256, extent=DEFAULT_EXTENT, labels=None):
+    """Build an index over the levels persisted in a store folder (see store_utils).
+
+    Levels are indexed from step 1 up to the first one that is missing, and
+    stay memory-mapped: queries only read the candidate triangles and words.
+    """
+    index = create_index(cells, extent, labels)
+    step = 1
+    while os.path.exists(os.path.join(folder, f"level_{step}.json")):
+        stored = load_level(folder, step)
+        add_step(index, step, stored['triangles'], stored['words'])
+        step += 1
+    return index
+
+def _candidates(entry, cells, columns, rows):
+    """Return the sorted, unique indices of the small triangles listed in a block of cells."""
+    members, offsets = entry['members'], entry['offsets']
+    runs = [
+        members[offsets[row * cells + columns[0]]:offsets[row * cells + columns[1] + 1]]
+        for row in range(rows[0], rows[1] + 1)
+    ]
+    return np.unique(np.concatenate(runs))
+
+def _words(words, hits, step, labels):
+    """Return the words at the given positions, decoded to strings if labels are known."""
+    if isinstance(words, np.ndarray) and words.dtype == WORD_DTYPE:
+        return decode_words(words[hits], step, labels) if labels is not None else words[hits].tolist()
+    return [words[hit] for hit in hits]
+
+def _contains_point(edges, x, y):
+    a, b, c = edges
+    return (a * x + b * y + c >= 0).all(axis=1)
+
+def _overlaps_box(edges, bounds, xmin, xmax, ymin, ymax):
+    # Separating axis test: box axes first, then the three edge normals
+    overlap = (bounds[0] <= xmax) & (bounds[1] >= xmin) & (bounds[2] <= ymax) & (bounds[3] >= ymin)
+    a, b, c = edges
+    farthest = c + np.maximum(a * xmin, a * xmax) + np.maximum(b * ymin, b * ymax)
+    return overlap & (farthest >= 0).all(axis=1)
+
+def contains_point(triangles, x, y):
+    """Check which (N, 2, 3) triangles contain the point (x, y), boundary included."""
+    return _contains_point(_halfplanes(triangles), x, y)
+
+def overlaps_box(triangles, xmin, xmax, ymin, ymax):
+    """Check which (N, 2, 3) triangles meet the box [xmin, xmax] x [ymin, ymax]."""
+    return _overlaps_box(_halfplanes(triangles), _bounds(triangles), xmin, xmax, ymin, ymax)
+
+def _matches(entry, labels, candidates, test):
+    """Return the (step, word) pairs of the candidates and large triangles passing test."""
+    triangles = np.asarray(entry['triangles'][candidates], dtype=float)
+    small = candidates[test(_halfplanes(triangles), _bounds(triangles))]
+    large = entry['large'][test(entry['large_edges'], entry['large_bounds'])]
+    hits = np.sort(np.concatenate((small, large)))
+    return [(entry['step'], word) for word in _words(entry['words'], hits, entry['step'], labels)]
+
+def query_point(index, x, y):
+    """Return the words whose triangle contains the point (x, y).
+
+    Returns:
+        list: (step, word) pairs, by step and then in generation order.
+    """
+    column, row = _cell_coordinates(index, x, y)
+    matches = []
+    for entry in index['steps']:
+        candidates = _candidates(entry, index['cells'], (column, column), (row, row))
+        matches.extend(_matches(entry, index['labels'], candidates, lambda edges, bounds: _contains_point(edges, x, y)))
+    return matches
+
+def query_box(index, xmin, xmax, ymin, ymax):
+    """Return the words whose triangle meets the box [xmin, xmax] x [ymin, ymax].
+
+    Returns:
+        list: (step, word) pairs, by step and then in generation order.
+    """
+    columns, rows = _cell_coordinates(index, [xmin, xmax], [ymin, ymax])
+    matches = []
+    for entry in index['steps']:
+        candidates = _candidates(entry, index['cells'], columns, rows)
+        matches.extend(_matches(entry, index['labels'], candidates, lambda edges, bounds: _overlaps_box(edges, bounds, xmin, xmax, ymin, ymax)))
+    return matches
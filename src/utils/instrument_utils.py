@@ -0,0 +1,141 @@
+"""
+Named stage timers and counters for profiling generation and rendering.
+
+Instrumentation is disabled by default: timer then returns one shared no-op
+context manager and count returns immediately, so instrumented code only pays
+a function call and a flag check per stage. When enabled, timers (seconds and
+number of calls) and counters accumulate until record_step closes a step,
+prints its summary and optionally appends it as one JSON line to a trace
+file. instrumentation_report returns the totals of the run.
+
+Values are attributed to the next step recorded, unless they are tagged with
+the step they belong to: lazy generators produce step n + 1 while step n is
+still being rendered (itertools.groupby reads one chunk ahead), so they tag
+their stages to keep them out of step n.
+
+Only the current process is instrumented; frames rendered on a process pool
+(plot_combinations_parallel) are not recorded.
+"""
+import contextlib
+import json
+import time
+
+_DISABLED_TIMER = contextlib.nullcontext()
+
+_state = {
+    'enabled': False,
+    'trace_file': None,
+    'timers': {},
+    'counters': {},
+    'total_timers': {},
+    'total_counters': {},
+}
+
+def enable_instrumentation(trace_file=None):
+    """Start recording timers and counters from scratch.
+
+    Args:
+        trace_file: Optional path of a JSON lines file, truncated here, to
+            which every record_step appends the statistics of its step
+    """
+    _state.update(enabled=True, trace_file=trace_file, timers={}, counters={}, total_timers={}, total_counters={})
+    if trace_file is not None:
+        open(trace_file, 'w').close()
+
+def disable_instrumentation():
+    """Stop recording and return the final instrumentation_report."""
+    report = instrumentation_report()
+    _state['enabled'] = False
+    return report
+
+def instrumentation_enabled():
+    """Return whether instrumentation is currently enabled."""
+    return _state['enabled']
+
+@contextlib.contextmanager
+def _timed(key):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds, calls = _state['timers'].get(key, (0.0, 0))
+        _state['timers'][key] = (seconds + time.perf_counter() - start, calls + 1)
+
+def timer(name, step=None):
+    """Return a context manager adding the time spent in its block to stage name.
+
+    Args:
+        name: Stage name, e.g. 'render.savefig'
+        step: Optional step the time belongs to (see the module docstring)
+    """
+    return _timed((step, name)) if _state['enabled'] else _DISABLED_TIMER
+
+def add_count(name, value=1, step=None):
+    """Add value to counter name, optionally tagged with its step."""
+    if _state['enabled']:
+        key = (step, name)
+        _state['counters'][key] = _state['counters'].get(key, 0) + value
+
+def _merge(timers, counters):
+    for name, (seconds, calls) in timers.items():
+        total_seconds, total_calls = _state['total_timers'].get(name, (0.0, 0))
+        _state['total_timers'][name] = (total_seconds + seconds, total_calls + calls)
+    for name, value in counters.items():
+        _state['total_counters'][name] = _state['total_counters'].get(name, 0) + value
+
+def _as_record(timers, counters):
+    return {
+        'timers': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in sorted(timers.items())},
+        'counters': dict(sorted(counters.items())),
+    }
+
+def format_record(record):
+    """Format the timers and counters of a record on one line."""
+    timers = ', '.join(f"{name} {value['seconds']:.3f} s" for name, value in record['timers'].items())
+    counters = ', '.join(f"{name} {value}" for name, value in record['counters'].items())
+    return f"{timers}; {counters}" if counters else timers
+
+def _take(values, step):
+    """Remove and return the untagged values and those tagged with step, by name."""
+    taken = {}
+    for key in [key for key in values if key[0] in (None, step)]:
+        name = key[1]
+        value = values.pop(key)
+        if name in taken:
+            value = tuple(map(sum, zip(taken[name], value))) if isinstance(value, tuple) else taken[name] + value
+        taken[name] = value
+    return taken
+
+def record_step(step):
+    """Close a step: print its statistics and append them to the trace file.
+
+    Returns:
+        dict: 'step', 'timers' (name -> 'seconds' and 'calls') and
+        'counters' for the step, or None if instrumentation is disabled.
+    """
+    if not _state['enabled']:
+        return None
+    timers, counters = _take(_state['timers'], step), _take(_state['counters'], step)
+    record = {'step': step, **_as_record(timers, counters)}
+    _merge(timers, counters)
+
+    print(f"Step {step} stages: {format_record(record)}")
+    if _state['trace_file'] is not None:
+        with open(_state['trace_file'], 'a') as handle:
+            handle.write(json.dumps(record) + "\n")
+    return record
+
+def instrumentation_report():
+    """Return the totals of the run, including values of steps not yet recorded.
+
+    Returns:
+        dict: 'timers' (name -> 'seconds' and 'calls') and 'counters'.
+    """
+    timers = dict(_state['total_timers'])
+    counters = dict(_state['total_counters'])
+    for (_, name), (seconds, calls) in _state['timers'].items():
+        total_seconds, total_calls = timers.get(name, (0.0, 0))
+        timers[name] = (total_seconds + seconds, total_calls + calls)
+    for (_, name), value in _state['counters'].items():
+        counters[name] = counters.get(name, 0) + value
+    return _as_record(timers, counters)
@@ -0,0 +1,40 @@
+"""
+Sorted sets of fixed-size integer rows packed as opaque keys.
+
+A row of int64 values is viewed as one np.void scalar holding the same bytes,
+so a set of rows is a single sorted array: membership is a binary search and
+the new keys of a batch are inserted with one np.insert, without hashing the
+rows as Python tuples. The keys sort by their bytes, an order without
+meaning but consistent, which is all deduplication needs.
+"""
+import numpy as np
+
+def key_dtype(width):
+    """Return the dtype of the keys of rows of width int64 values."""
+    return np.dtype((np.void, 8 * width))
+
+def pack_keys(rows):
+    """Pack an (N, ...) int64 array into (N,) keys, one per row."""
+    rows = np.ascontiguousarray(rows, dtype=np.int64)
+    width = int(np.prod(rows.shape[1:]))
+    return rows.reshape(len(rows), width).view(key_dtype(width)).ravel()
+
+def insert_keys(seen, keys):
+    """Insert keys into a sorted key set.
+
+    Args:
+        seen: Sorted array of keys (see pack_keys)
+        keys: Array of keys of the same dtype, in any order and possibly repeated
+
+    Returns:
+        tuple: (new, seen) with new the mask of the keys that were not in
+        seen, marking only the first of each repeated key, and seen the
+        updated sorted key set.
+    """
+    unique, first = np.unique(keys, return_index=True)
+    positions = np.searchsorted(seen, unique)
+    found = seen[np.minimum(positions, len(seen) - 1)] == unique if len(seen) else np.zeros(len(unique), dtype=bool)
+    new = np.zeros(len(keys), dtype=bool)
+    new[first[~found]] = True
+    # unique is sorted, so inserting at the search positions keeps seen sorted
+    return new, np.insert(seen, positions[~found], unique[~found])
@@ -0,0 +1,174 @@
+"""
+Backward-search oracle deciding whether points are covered by the orbit.
+
+A point p lies in the triangle of a word W = a_1 ... a_n (a_1 applied first)
+if and only if W^-1 p = M_{a_1}^-1 ... M_{a_n}^-1 p lies in the seed. The
+search therefore starts from p and prepends one letter per step, applying
+the inverse of the new first letter, until the point lands in the seed. It
+runs breadth-first over all the query points at once, so the first word
+found for a point is a shortest one, and it is cut by:
+- pruning: a state q can only reach the seed within r more letters if
+  |q| <= R * B_r, with R the largest norm of a seed vertex and B_r a bound
+  on the norm of every r-letter word (see prune_utils.word_norm_bounds);
+- memoization: a state equal (to MEMO_DECIMALS decimals) to one already
+  reached by the same query at the same or a smaller depth is dropped, so
+  relations between the generators, and cancelling letters when words are
+  not reduced, do not multiply the states.
+"""
+import numpy as np
+from src.utils.compute_utils import expansion_pairs, inverse_positions, reduced_mask, stack_matrices
+from src.utils.index_utils import contains_point
+from src.utils.instrument_utils import add_count
+from src.utils.key_utils import insert_keys, key_dtype, pack_keys
+from src.utils.prune_utils import PRUNE_SLACK, word_norm_bounds
+from src.utils.raster_utils import DEFAULT_EXTENT
+from src.utils.word_utils import WORD_DTYPE, check_word_length, decode_word
+
+# Status of each query point
+COVERED = 1
+NOT_COVERED = 0
+UNDECIDED = -1
+
+# States are memoized on their coordinates rounded to this many decimals
+MEMO_DECIMALS = 9
+
+# Default upper bound on the states of one search level
+MAX_STATES = 2 ** 22
+
+def _state_keys(queries, states):
+    """Pack query indices and rounded (n, 2) states into (n,) keys of (query, x, y) rows."""
+    rounded = np.round(states, MEMO_DECIMALS) + 0.0  # + 0.0 merges -0.0 into 0.0
+    packed = np.empty((len(states), 3), dtype=np.int64)
+    packed[:, 0] = queries
+    packed[:, 1:] = rounded.view(np.int64)
+    return pack_keys(packed)
+
+def _drop_largest(counts, limit):
+    """Return the queries with the most states to drop so that the total fits in limit."""
+    excess = counts.sum() - limit
+    if excess <= 0:
+        return np.empty(0, dtype=np.int64)
+    order = np.argsort(-counts, kind='stable')
+    return order[:np.searchsorted(np.cumsum(counts[order]), excess) + 1]
+
+def covering_words(points, max_step, labels, vertices, matrix_map, inverses=None, max_states=MAX_STATES):
+    """Search, for every point, a word of at most max_step letters whose triangle contains it.
+
+    The seed itself counts as the empty word. A point is NOT_COVERED only
+    when its whole search space was ruled out; points whose search would
+    exceed max_states states per level are given up (the ones with the most
+    states first) and reported UNDECIDED.
+
+    Args:
+        points: Array of shape (Q, 2) of query points
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        inverses: Optional dictionary mapping labels to their inverse labels,
+            to only search freely reduced words
+        max_states: Upper bound on the states of one search level
+
+    Returns:
+        dict: 'status' (COVERED, NOT_COVERED or UNDECIDED per point),
+        'words' (packed witness words, see word_utils) and 'lengths' (their
+        lengths, -1 where no word was found).
+    """
+    check_word_length(max_step, len(labels))
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    seed = np.asarray(vertices, dtype=float)[np.newaxis]
+    size = len(labels)
+    inverse_matrices = np.linalg.inv(stack_matrices(labels, matrix_map).astype(float))
+    positions = inverse_positions(labels, inverses) if inverses else None
+    # Norms of the inverses of words of inverse generators, i.e. of the words themselves
+    limits = np.linalg.norm(seed[0], axis=0).max() * word_norm_bounds(inverse_matrices, max_step) * (1 + PRUNE_SLACK)
+
+    status = np.full(len(points), NOT_COVERED, dtype=np.int8)
+    words = np.zeros(len(points), dtype=WORD_DTYPE)
+    lengths = np.full(len(points), -1, dtype=np.int64)
+    status[contains_point(seed, points[:, 0, np.newaxis], points[:, 1, np.newaxis])] = COVERED
+    lengths[status == COVERED] = 0
+
+    queries = np.flatnonzero(status == NOT_COVERED)
+    states = points[queries]
+    codes = np.zeros(len(queries), dtype=WORD_DTYPE)
+    first = None
+    reachable = np.linalg.norm(states, axis=1) <= limits[max_step]
+    queries, states, codes = queries[reachable], states[reachable], codes[reachable]
+    seen = insert_keys(np.empty(0, dtype=key_dtype(3)), _state_keys(queries, states))[1]
+
+    for step in range(1, max_step + 1):
+        if not len(queries):
+            break
+        dropped = _drop_largest(np.bincount(queries, minlength=len(points)) * size, max_states)
+        if len(dropped):
+            status[dropped] = UNDECIDED
+            kept = status[queries] == NOT_COVERED
+            queries, states, codes = queries[kept], states[kept], codes[kept]
+            first = first[kept] if first is not None else None
+
+        # Prepend every allowed letter and undo it on the state
+        allowed = reduced_mask(first, positions) if positions is not None and first is not None else None
+        parents, first = expansion_pairs(len(queries), size, allowed)
+        expanded = np.empty((len(parents), 2))
+        for index, matrix in enumerate(inverse_matrices):
+            selected = first == index
+            expanded[selected] = states[parents[selected]] @ matrix.T
+        queries, states = queries[parents], expanded
+        codes = first.astype(WORD_DTYPE) * WORD_DTYPE(size) ** WORD_DTYPE(step - 1) + codes[parents]
+
+        # The first state of each query landing in the seed is a shortest witness
+        inside = contains_point(seed, states[:, 0, np.newaxis], states[:, 1, np.newaxis])
+        found, witness = np.unique(queries[inside], return_index=True)
+        witness = np.flatnonzero(inside)[witness]
+        status[found], words[found], lengths[found] = COVERED, codes[witness], step
+
+        kept = (status[queries] == NOT_COVERED) & (np.linalg.norm(states, axis=1) <= limits[max_step - step])
+        queries, states, codes, first = queries[kept], states[kept], codes[kept], first[kept]
+        new, seen = insert_keys(seen, _state_keys(queries, states))
+        queries, states, codes, first = queries[new], states[new], codes[new], first[new]
+        add_count('oracle_states', len(queries))
+
+    return {'status': status, 'words': words, 'lengths': lengths}
+
+def covering_word(x, y, max_step, labels, vertices, matrix_map, inverses=None, max_states=MAX_STATES):
+    """Return a shortest word whose triangle contains (x, y), as a string.
+
+    Returns:
+        str: The witness word ('' for the seed itself), or None if the point
+        is not covered up to max_step or its search exceeded max_states.
+    """
+    result = covering_words([[x, y]], max_step, labels, vertices, matrix_map, inverses, max_states)
+    if result['status'][0] != COVERED:
+        return None
+    return decode_word(result['words'][0], result['lengths'][0], labels)
+
+def sample_coverage(max_step, labels, vertices, matrix_map, samples=10000, region=DEFAULT_EXTENT, seed=0, inverses=None, max_states=MAX_STATES, verbose=False):
+    """Estimate the covered fraction of a region from uniformly sampled points.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        samples: Number of points drawn uniformly in region
+        region: (xmin, xmax, ymin, ymax) box to sample
+        seed: Seed of the sampled points
+        inverses: Optional dictionary mapping labels to their inverse labels
+        max_states: Upper bound on the states of one search level
+        verbose: If True, print the estimated fractions
+
+    Returns:
+        dict: 'points' and the covering_words result for them, with
+        'covered_fraction' (over all samples) and 'undecided_fraction'.
+    """
+    xmin, xmax, ymin, ymax = region
+    rng = np.random.default_rng(seed)
+    points = np.column_stack((rng.uniform(xmin, xmax, samples), rng.uniform(ymin, ymax, samples)))
+    result = covering_words(points, max_step, labels, vertices, matrix_map, inverses, max_states)
+    result['points'] = points
+    result['covered_fraction'] = np.count_nonzero(result['status'] == COVERED) / samples
+    result['undecided_fraction'] = np.count_nonzero(result['status'] == UNDECIDED) / samples
+    if verbose:
+        print(f"Covered {result['covered_fraction']:.2%} of {samples} sampled points, {result['undecided_fraction']:.2%} undecided")
+    return result
@@ -0,0 +1,32 @@
+"""
+Helpers for sharing NumPy arrays with worker processes through shared memory.
+
+An array is written once into a SharedMemory block and described by a small,
+picklable spec (name, shape, dtype); workers attach to the block by name and
+get a zero-copy view instead of receiving a pickled copy of the data.
+"""
+from multiprocessing import shared_memory
+import numpy as np
+
+def create_shared_array(shape, dtype):
+    """Create an uninitialized array in a new shared memory block.
+
+    Returns:
+        tuple: (shm, spec, array) where shm is the SharedMemory block, which
+        the caller must close and unlink when done, spec is the dictionary
+        to pass to attach_array in the workers and array is a view on the
+        block to fill in; drop the view before calling shm.close().
+    """
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return shm, {'name': shm.name, 'shape': tuple(shape), 'dtype': dtype.str}, array
+def attach_array(spec):
+    """Attach to an array created with create_shared_array.
+
+    Returns:
+        tuple: (shm, array) where array is a view on the shared block; drop
+        the view before calling shm.close().
+    """
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    return shm, np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=shm.buf)
@@ -0,0 +1,20 @@
+"""
+Lazy access to matplotlib for the modules that save images.
+
+matplotlib is only imported when something is plotted, so the generation and
+rasterization code can be used without it.
+"""
+import sys
+
+def pyplot():
+    """Import pyplot on first use.
+
+    Plots are only ever saved to files, so the non-interactive Agg backend is
+    selected unless pyplot was already imported (with its own backend) by the
+    caller.
+    """
+    if 'matplotlib.pyplot' not in sys.modules:
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
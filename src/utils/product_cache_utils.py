@@ -0,0 +1,69 @@
+"""
+Persistent cache of word products shared by all runs with the same generators.
+
+The 2x2 products of the words do not depend on the seed triangle, so they
+are generated once per set of generators and reused by every entry point
+(the standard and non-dense seeds share the ABCDEF products, each h_k run
+reuses its THIK products). Each set of generators gets a folder named after
+its level_fingerprint with the identity as seed, holding its levels in the
+store_utils format: (N, 2, 2) products, words and generators, plus the exact
+state in exact mode.
+
+The cache is bounded in size: after a run, the least recently used folders
+are deleted until the whole cache fits in max_bytes.
+"""
+import os
+import shutil
+
+# Default cache location, overridable with the TRIANGLE_PRODUCT_CACHE environment variable
+DEFAULT_CACHE_FOLDER = os.environ.get(
+    'TRIANGLE_PRODUCT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'triangle_products')
+)
+
+# Default size bound of the whole cache
+DEFAULT_MAX_BYTES = 2 * 2 ** 30
+
+def product_folder(cache_folder, fingerprint):
+    """Return the folder of a set of generators, marking it as just used."""
+    folder = os.path.join(cache_folder, fingerprint)
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, "last_used"), 'w'):
+        pass
+    return folder
+
+def folder_size(folder):
+    """Return the total size in bytes of the files in a folder."""
+    return sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+
+def evict_products(cache_folder, max_bytes=DEFAULT_MAX_BYTES, keep=None):
+    """Delete least recently used folders until the cache fits in max_bytes.
+
+    Args:
+        cache_folder: Cache folder
+        max_bytes: Size bound of the whole cache
+        keep: Optional folder never to evict (the one in use)
+
+    Returns:
+        list: The evicted folders.
+    """
+    if not os.path.isdir(cache_folder):
+        return []
+    folders = [entry.path for entry in os.scandir(cache_folder) if entry.is_dir()]
+    sizes = {folder: folder_size(folder) for folder in folders}
+
+    def last_used(folder):
+        marker = os.path.join(folder, "last_used")
+        return os.path.getmtime(marker) if os.path.exists(marker) else 0.0
+
+    total = sum(sizes.values())
+    evicted = []
+    for folder in sorted(folders, key=last_used):
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.samefile(folder, keep):
+            continue
+        shutil.rmtree(folder)
+        total -= sizes[folder]
+        evicted.append(folder)
+        print(f"Evicted cached products {folder}")
+    return evicted
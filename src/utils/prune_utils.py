@@ -0,0 +1,79 @@
+"""
+Bounds used to prune words whose images can no longer reach a region.
+
+A word W maps every point p to a point of norm at least |p| / ||W^-1||,
+where ||.|| is the spectral norm. If B_r bounds ||W^-1|| over all words of
+r letters, the images of a triangle at distance d from the origin after r
+more letters are at distance at least d / B_r. B_r is exact (a maximum over
+all words) up to a few letters and extended to longer words by
+submultiplicativity, B_(a+b) <= B_a * B_b; it is non-decreasing in r, so it
+also bounds the shallower descendants. A branch whose triangle satisfies
+d > R * B_r, with R the largest norm of a point of the region, can never
+come back to the region within r letters and is pruned.
+
+Triangles containing the origin have d = 0 and are never pruned; this is the
+case for every image of a seed containing the origin.
+"""
+import numpy as np
+
+# Relative slack keeping float rounding from pruning a branch on the boundary
+PRUNE_SLACK = 1e-9
+
+def word_norm_bounds(matrices, max_length, max_words=100000):
+    """Bound the spectral norm of the inverse of every word, by word length.
+
+    Args:
+        matrices: (L, 2, 2) stack of generators
+        max_length: Longest word length needed
+        max_words: Largest number of words enumerated for the exact bounds
+
+    Returns:
+        Array B of shape (max_length + 1,) with B[r] >= ||W^-1|| for every
+        word W of r letters, and B non-decreasing.
+    """
+    inverses = np.linalg.inv(np.asarray(matrices, dtype=float))
+    bounds = np.ones(max_length + 1)
+    products = np.eye(2)[np.newaxis]
+    for length in range(1, max_length + 1):
+        if len(products) * len(inverses) <= max_words:
+            # Exact maximum over all the words of this length
+            products = np.matmul(products[:, np.newaxis], inverses[np.newaxis]).reshape(-1, 2, 2)
+            bounds[length] = np.linalg.norm(products, ord=2, axis=(1, 2)).max()
+        else:
+            bounds[length] = min(bounds[split] * bounds[length - split] for split in range(1, length))
+    return np.maximum.accumulate(bounds)
+
+def region_radius(region):
+    """Return the largest distance from the origin of a point of an (xmin, xmax, ymin, ymax) box."""
+    xmin, xmax, ymin, ymax = region
+    return float(np.hypot(max(abs(xmin), abs(xmax)), max(abs(ymin), abs(ymax))))
+
+def origin_distances(triangles):
+    """Return the distance from the origin to each (N, 2, 3) triangle (0 if it contains it)."""
+    start = triangles
+    end = np.roll(triangles, -1, axis=2)
+    edge = end - start
+    # Closest point of each edge to the origin
+    length = np.einsum('nij,nij->nj', edge, edge)
+    along = np.divide(-np.einsum('nij,nij->nj', start, edge), length, out=np.zeros_like(length), where=length > 0)
+    closest = start + edge * np.clip(along, 0, 1)[:, np.newaxis]
+    distances = np.hypot(closest[:, 0], closest[:, 1]).min(axis=1)
+
+    cross = start[:, 0] * end[:, 1] - start[:, 1] * end[:, 0]
+    inside = (cross >= 0).all(axis=1) | (cross <= 0).all(axis=1)
+    return np.where(inside, 0.0, distances)
+
+def reachable_mask(triangles, radius, norm_bound):
+    """Mark the triangles whose descendants may still reach the region.
+
+    Args:
+        triangles: (N, 2, 3) array of triangles
+        radius: Value returned by region_radius
+        norm_bound: Entry of word_norm_bounds for the number of letters
+            still to be appended
+
+    Returns:
+        Boolean array, False for the branches that can be pruned.
+    """
+    limit = radius * norm_bound * (1 + PRUNE_SLACK)
+    return origin_distances(np.asarray(triangles, dtype=float)) <= limit
@@ -0,0 +1,181 @@
+"""
+NumPy scanline rasterizer that accumulates triangles into a hit-count grid.
+
+A density grid is stored in row-difference form: an int64 array of shape
+(H, W + 1) where each covered run of pixels in a row adds +1 at its first
+column and -1 just after its last one. Adding a triangle therefore costs one
+update per pixel row it spans, independent of its width, and grid_counts turns
+the grid into per-pixel hit counts with a single cumulative sum.
+
+A pixel is covered when its centre lies in the triangle (edge-function test
+along each row). Triangles that contain no pixel centre (sub-pixel or very
+thin ones) are counted once in the pixel containing their centroid.
+"""
+import numpy as np
+from src.utils.plot_utils import pyplot
+
+# Extent (xmin, xmax, ymin, ymax) of the fixed plotting window
+DEFAULT_EXTENT = (-10, 10, -10, 10)
+
+# Upper bound on the (triangle, pixel row) pairs processed at once
+MAX_ROWS_PER_BATCH = 2 ** 22
+
+def create_density_grid(resolution=1500):
+    """Create an empty square density grid (row 0 is the top of the window)."""
+    return np.zeros((resolution, resolution + 1), dtype=np.int64)
+
+def grid_counts(grid):
+    """Return the per-pixel hit counts of a density grid."""
+    return np.cumsum(grid, axis=1)[:, :-1]
+
+def to_pixel_coordinates(triangles, shape, extent=DEFAULT_EXTENT):
+    """Convert (N, 2, 3) triangles to x and y pixel coordinates of shape (N, 3) each."""
+    height, width = shape
+    xmin, xmax, ymin, ymax = extent
+    triangles = np.asarray(triangles, dtype=float)
+    x = (triangles[:, 0, :] - xmin) * (width / (xmax - xmin))
+    y = (ymax - triangles[:, 1, :]) * (height / (ymax - ymin))
+    return x, y
+
+def _edge_line(x0, y0, x1, y1):
+    """Return (intercept, slope) such that x = intercept + y * slope on each edge."""
+    height = y1 - y0
+    slope = np.divide(x1 - x0, height, out=np.zeros_like(height), where=height != 0)
+    return x0 - y0 * slope, slope
+
+def _row_spans(x, y, rows):
+    """Intersect triangles with the horizontal lines through pixel-row centres.
+
+    The edge joining the top and bottom corners crosses every row of the
+    triangle; the other crossing is on the upper or lower short edge depending
+    on the side of the middle corner.
+
+    Args:
+        x, y: Pixel coordinates of the corners, shape (n, 3)
+        rows: Row indices within each triangle's vertical extent, shape (n, k)
+
+    Returns:
+        tuple: (left, right) x coordinates of each span, shape (n, k).
+    """
+    order = np.argsort(y, axis=1)
+    x = np.take_along_axis(x, order, axis=1)
+    y = np.take_along_axis(y, order, axis=1)
+    (top_x, mid_x, bottom_x), (top_y, mid_y, bottom_y) = x.T[:, :, np.newaxis], y.T[:, :, np.newaxis]
+    long_intercept, long_slope = _edge_line(top_x, top_y, bottom_x, bottom_y)
+    upper_intercept, upper_slope = _edge_line(top_x, top_y, mid_x, mid_y)
+    lower_intercept, lower_slope = _edge_line(mid_x, mid_y, bottom_x, bottom_y)
+
+    centre = rows + 0.5
+    upper = centre < mid_y
+    long_edge = long_intercept + centre * long_slope
+    short_edge = np.where(upper, upper_intercept, lower_intercept)
+    short_edge += centre * np.where(upper, upper_slope, lower_slope)
+    return np.minimum(long_edge, short_edge), np.maximum(long_edge, short_edge)
+
+def cover_triangles(triangles, grid, extent=DEFAULT_EXTENT):
+    """Add one hit to every pixel of grid whose centre lies in a triangle.
+
+    Unlike rasterize_triangles, triangles without any pixel centre are not
+    splatted, so that callers rasterizing several parts of a larger grid can
+    decide on the splat once over the whole grid.
+
+    Args:
+        triangles: Array of shape (N, 2, 3) with triangles in columns
+        grid: Density grid from create_density_grid, updated in place
+        extent: (xmin, xmax, ymin, ymax) of the window covered by grid
+
+    Returns:
+        Boolean array marking the triangles that contain a pixel centre.
+    """
+    height, width = grid.shape[0], grid.shape[1] - 1
+    flat_grid = grid.reshape(-1)
+    x, y = to_pixel_coordinates(triangles, (height, width), extent)
+
+    # Pixel rows whose centres fall in each bounding box, clipped to the grid
+    row_start = np.maximum(np.ceil(y.min(axis=1) - 0.5), 0).astype(np.int64)
+    row_stop = np.minimum(np.floor(y.max(axis=1) - 0.5), height - 1).astype(np.int64)
+    inside_x = (x.max(axis=1) >= 0) & (x.min(axis=1) < width)
+    spans = (row_stop >= row_start) & inside_x
+    hit = np.zeros(len(x), dtype=bool)
+
+    # Bucket the triangles by power-of-two bounding-box height
+    box_height = np.where(spans, row_stop - row_start + 1, 1)
+    bucket_height = 1 << np.ceil(np.log2(box_height)).astype(np.int64)
+
+    for bucket in np.unique(bucket_height[spans]):
+        members = np.flatnonzero(spans & (bucket_height == bucket))
+        size = box_height[members].max()
+        batch = max(1, MAX_ROWS_PER_BATCH // size)
+        for begin in range(0, len(members), batch):
+            index = members[begin:begin + batch]
+            rows = row_start[index, np.newaxis] + np.arange(size)
+            left, right = _row_spans(x[index], y[index], rows)
+            first = np.maximum(np.ceil(left - 0.5), 0)
+            last = np.minimum(np.floor(right - 0.5), width - 1)
+            covered = (rows <= row_stop[index, np.newaxis]) & (first <= last)
+            hit[index] = covered.any(axis=1)
+            offsets = rows[covered] * (width + 1)
+            np.add.at(flat_grid, offsets + first[covered].astype(np.int64), 1)
+            np.add.at(flat_grid, offsets + last[covered].astype(np.int64) + 1, -1)
+
+    return hit
+
+def centroid_pixels(triangles, shape, extent=DEFAULT_EXTENT):
+    """Return the (row, column) pixels holding the centroids of triangles, for those inside the grid."""
+    height, width = shape
+    x, y = to_pixel_coordinates(triangles, shape, extent)
+    centroid_x, centroid_y = x.mean(axis=1), y.mean(axis=1)
+    visible = (centroid_x >= 0) & (centroid_x < width) & (centroid_y >= 0) & (centroid_y < height)
+    return centroid_y[visible].astype(np.int64), centroid_x[visible].astype(np.int64)
+
+def rasterize_triangles(triangles, grid, extent=DEFAULT_EXTENT):
+    """Add one hit to every pixel of grid whose centre lies in a triangle.
+
+    Args:
+        triangles: Array of shape (N, 2, 3) with triangles in columns
+        grid: Density grid from create_density_grid, updated in place
+        extent: (xmin, xmax, ymin, ymax) of the window covered by grid
+
+    Returns:
+        int: Number of triangles that touched the grid.
+    """
+    hit = cover_triangles(triangles, grid, extent)
+
+    # Triangles without any pixel centre are splatted at their centroid
+    width = grid.shape[1] - 1
+    rows, columns = centroid_pixels(np.asarray(triangles)[~hit], (grid.shape[0], width), extent)
+    flat_grid = grid.reshape(-1)
+    np.add.at(flat_grid, rows * (width + 1) + columns, 1)
+    np.add.at(flat_grid, rows * (width + 1) + columns + 1, -1)
+
+    return int(np.count_nonzero(hit)) + len(rows)
+
+def save_counts_png(counts, filename, color='purple', log_density=False, vmax=None):
+    """Write per-pixel hit counts as a PNG.
+
+    Args:
+        counts: 2D array of hit counts (row 0 at the top)
+        filename: Output file name
+        color: Colour of covered pixels on a white background (occupancy view)
+        log_density: If True, write a log-scaled heatmap of the hit counts instead
+        vmax: Count mapped to the top of the heatmap (defaults to the maximum
+            of counts), to share one scale between several images
+    """
+    # Only the PNG output needs matplotlib; the counts themselves are plain NumPy
+    plt = pyplot()
+    from matplotlib.colors import to_rgb
+
+    if log_density:
+        density = np.log1p(counts.astype(float))
+        top = np.log1p(vmax) if vmax is not None else density.max()
+        plt.imsave(filename, density, cmap='magma', vmin=0, vmax=max(top, 1.0))
+        return
+
+    image = np.ones(counts.shape + (3,))
+    image[counts > 0] = to_rgb(color)
+    plt.imsave(filename, image)
+
+def save_density_png(grid, filename, color='purple', log_density=False):
+    """Write a density grid as a PNG (see save_counts_png for the options)."""
+    print(f"Saving plot to: {filename}")
+    save_counts_png(grid_counts(grid), filename, color=color, log_density=log_density)
@@ -0,0 +1,47 @@
+"""
+Seeded random walks over the generators, for depths beyond exhaustive reach.
+
+A sample budget of N walks is split into chunks of at most chunk_size walks,
+each with its own random generator spawned from one seed sequence, so a run
+is reproducible from (seed, samples, chunk_size) alone. Every walk appends
+one letter per step, drawn uniformly among the labels (or, given inverse
+positions, among the labels that keep the word freely reduced), so the walks
+at step n are a uniform sample of the level-n words.
+"""
+import numpy as np
+
+def walk_generators(seed, samples, chunk_size):
+    """Create one random generator per chunk of walks.
+
+    Returns:
+        list: (count, rng) pairs, one per chunk, with the counts summing to
+        samples.
+    """
+    counts = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+    children = np.random.SeedSequence(seed).spawn(len(counts))
+    return [(count, np.random.default_rng(child)) for count, child in zip(counts, children)]
+
+def draw_letters(rng, previous, size, positions=None):
+    """Draw the next letter of every walk of a chunk.
+
+    Args:
+        rng: Random generator of the chunk
+        previous: Label index of the last letter of each walk, or an int
+            giving the number of walks for the first letter
+        size: Number of labels
+        positions: Optional inverse positions (see inverse_positions); the
+            inverse of the last letter is then never drawn
+
+    Returns:
+        Integer array with the label index drawn for each walk.
+    """
+    if np.isscalar(previous):
+        return rng.integers(size, size=previous)
+    if positions is None:
+        return rng.integers(size, size=len(previous))
+
+    # Draw among the size - 1 other labels and skip over the inverse
+    forbidden = positions[previous]
+    cancels = forbidden >= 0
+    letters = rng.integers(np.where(cancels, size - 1, size))
+    return letters + (cancels & (letters >= forbidden))
@@ -1,49 +1,79 @@
 """
 Shared utilities for matrix transformations and visualizations.
+
+matplotlib is only imported when something is plotted (see plot_utils); the
+generation functions live in compute_utils and are re-exported here.
 """
-from matplotlib.collections import PolyCollection
-import matplotlib.pyplot as plt
-from itertools import product
+from itertools import groupby
+import multiprocessing
 import numpy as np
 import os
+# Generation functions, also re-exported for the modules importing them from here
+from src.utils.compute_utils import (
+    apply_sequence, apply_sequence_with_cache, generate_combinations, generate_seed_steps, generate_steps,
+    group_growth, iter_cached_steps, iter_group_steps, iter_pruned_steps, iter_sampled_steps, iter_sharded_steps, iter_step_chunks,
+    iter_steps, level_sizes, measure_coverage, unpack_sequence
+)
+from src.utils.coverage_utils import add_triangles, finish_step, format_stats, should_stop
+from src.utils.instrument_utils import add_count, record_step, timer
+from src.utils.parallel_utils import attach_array, create_shared_array
+# pyplot is also re-exported for the modules importing it from here
+from src.utils.plot_utils import pyplot
+from src.utils.raster_utils import DEFAULT_EXTENT, create_density_grid, rasterize_triangles, save_density_png
+from src.utils.tile_utils import TILE_EXTENT, add_pyramid_triangles, create_pyramid, save_pyramid
 
-def unpack_sequence(sequence_str, matrix_map):
-    """Convert a string of matrix labels into a list of matrices."""
-    try:
-        return [matrix_map[char] for char in sequence_str]
-    except KeyError:
-        valid_labels = ', '.join(sorted(matrix_map.keys()))
-        print(f"Invalid sequence. Use only: {valid_labels}")
-        return None
-
-def apply_sequence(matrices, points):
-    """Apply a sequence of matrices to points (column-based coordinates)."""
-    for matrix in matrices:
-        points = np.dot(matrix, points)  # Matrix multiplication with column-based coordinates
-    return points
-
-def generate_combinations(n, labels):
-    """Generate all combinations of labels of length n."""
-    return [''.join(comb) for comb in product(labels, repeat=n)]
-
-def plot_triangles(triangles, title, color, vertices, original=True, step=None, output_folder="Spanning"):
-    """Plot triangles efficiently using PolyCollection."""
-    os.makedirs(output_folder, exist_ok=True)
+def cull_triangles(triangles, pixel_size, extent=DEFAULT_EXTENT):
+    """Drop triangles outside the viewport and reduce sub-pixel ones to points.
+
+    Args:
+        triangles: Array of shape (N, 2, 3) with triangles in columns
+        pixel_size: Size of one output pixel in data units
+        extent: (xmin, xmax, ymin, ymax) of the viewport
+
+    Returns:
+        tuple: (polygons, points, counts) where polygons is the (n, 2, 3)
+        array of triangles still drawn as polygons, points the (m, 2)
+        centroids of the sub-pixel triangles and counts a dictionary with the
+        number of 'culled', 'kept' and 'points' triangles.
+    """
+    xmin, xmax, ymin, ymax = extent
+    triangles = np.asarray(triangles, dtype=float)
+    lower, upper = triangles.min(axis=2), triangles.max(axis=2)
+    visible = (upper[:, 0] >= xmin) & (lower[:, 0] <= xmax) & (upper[:, 1] >= ymin) & (lower[:, 1] <= ymax)
+    small = (upper - lower).max(axis=1) < pixel_size
+    
+    polygons = triangles[visible & ~small]
+    points = triangles[visible & small].mean(axis=2)
+    counts = {'culled': int(len(triangles) - np.count_nonzero(visible)), 'kept': len(polygons), 'points': len(points)}
+    return polygons, points, counts
 
-    fig, ax = plt.subplots(figsize=(10, 10))
+def count_culling(counts):
+    """Add the counts returned by cull_triangles to the instrumentation counters."""
+    add_count('triangles_culled', counts['culled'])
+    add_count('triangles_kept', counts['kept'])
+    add_count('triangles_as_points', counts['points'])
+
+def create_figure_template(vertices, original=True):
+    """Create the figure that plot_triangles reuses across steps.
+
+    The figure, axes, limits, labels, axis lines and grid are set up once,
+    together with an empty PolyCollection and an empty points line whose data
+    plot_triangles swaps for every plot.
+
+    Returns:
+        dict: 'fig', 'ax', 'collection' and 'points'. Close template['fig']
+        with pyplot().close when done.
+    """
+    from matplotlib.collections import PolyCollection
+    fig, ax = pyplot().subplots(figsize=(10, 10))
 
     # Plot the original triangle
     if original:
         ax.fill(vertices[0], vertices[1], color='gray', alpha=0.5, label='Original')
 
-    # Convert column-based coordinates to list of triangles for PolyCollection
-    triangle_list = []
-    for triangle in triangles:
-        vertices_list = np.column_stack((triangle[0], triangle[1]))
-        triangle_list.append(vertices_list)
-    
-    poly = PolyCollection(triangle_list, facecolors=color, alpha=0.6, edgecolors='black', linewidths=0.3)
-    ax.add_collection(poly)
+    collection = PolyCollection(np.empty((0, 3, 2)), alpha=0.6, edgecolors='black', linewidths=0.3)
+    ax.add_collection(collection, autolim=False)
+    (points,) = ax.plot([], [], ',', alpha=0.6, zorder=collection.get_zorder())
 
     # Set fixed plot limits to -10 to 10 on both axes
     ax.set_xlim(-10, 10)
@@ -51,69 +81,577 @@ def plot_triangles(triangles, title, color, vertices, original=True, step=None,
 
     ax.set_xlabel('x')
     ax.set_ylabel('y')
-    ax.set_title(title)
     ax.axhline(0, color='black', linewidth=0.5)
     ax.axvline(0, color='black', linewidth=0.5)
     ax.grid()
+    return {'fig': fig, 'ax': ax, 'collection': collection, 'points': points}
+
+def plot_triangles(triangles, title, color, vertices, original=True, step=None, output_folder="Spanning", cull=True, template=None):
+    """Plot triangles efficiently using PolyCollection.
+
+    If cull is True, triangles outside the [-10, 10] window are skipped and
+    sub-pixel triangles are drawn as single pixels (see cull_triangles).
+
+    If template (from create_figure_template) is given, its figure is reused:
+    only the collection's vertices, the points and the title are replaced.
+    Otherwise a template is created for this plot and closed afterwards.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    owned = template is None
+    if owned:
+        template = create_figure_template(vertices, original)
+    fig, ax = template['fig'], template['ax']
+
+    triangles = np.asarray(triangles, dtype=float)
+    points = np.empty((0, 2))
+    if cull:
+        # Pixel size in the saved image (saved at 150 dpi)
+        pixel_size = (DEFAULT_EXTENT[1] - DEFAULT_EXTENT[0]) / (ax.bbox.width * 150 / fig.dpi)
+        with timer('render.cull'):
+            triangles, points, counts = cull_triangles(triangles, pixel_size)
+        count_culling(counts)
+        print(f"Culled {counts['culled']} triangles, kept {counts['kept']}, drawn {counts['points']} as points")
+
+    with timer('render.polycollection'):
+        # (N, 2, 3) columns to the (N, 3, 2) vertex array PolyCollection expects
+        template['collection'].set_verts(np.transpose(triangles, (0, 2, 1)))
+        template['collection'].set_facecolor(color)
+    template['points'].set_data(points[:, 0], points[:, 1])
+    template['points'].set_color(color)
+    ax.set_title(title)
 
     # Save the plot
     filename = os.path.join(output_folder, f"Step_{step}.png" if step is not None else "output.png")
     print(f"Saving plot to: {filename}")
-    plt.savefig(filename, dpi=150, bbox_inches='tight')
-    plt.close(fig)
+    with timer('render.savefig'):
+        fig.savefig(filename, dpi=150, bbox_inches='tight')
+    add_count('bytes_written', os.path.getsize(filename))
+    if owned:
+        pyplot().close(fig)
 
-def apply_sequence_with_cache(sequence, points, matrix_map, cache):
-    """Apply a sequence of matrices with caching."""
-    sequence_key = tuple(sequence)
-    
-    if sequence_key in cache:
-        return cache[sequence_key]
+def create_canvas(vertices, original=True, title=""):
+    """Create the fixed [-10, 10] figure used by plot_triangles and draw it once.
+
+    The canvas persists across steps: triangles are drawn onto it chunk by
+    chunk with draw_triangles and save_canvas writes a snapshot with a title.
+    The figure is cropped to the tight bounding box that
+    savefig(bbox_inches='tight') would use with that title, so the snapshots
+    are pixel for pixel the images of plot_triangles. The grid, axis lines
+    and spines lie above the triangles there, so they are left out of the
+    canvas and only drawn on the snapshots.
+
+    Args:
+        vertices: Seed triangle (in columns)
+        original: Whether to draw the seed triangle
+        title: A title of the same height as the snapshot titles, for the
+            layout
+
+    Returns:
+        tuple: (fig, ax, title_background) where title_background is the
+        pixel region above the axes, saved before any title was drawn.
+    """
+    from matplotlib.transforms import Bbox
+    fig, ax = pyplot().subplots(figsize=(10, 10), dpi=150)
+
+    # Plot the original triangle
+    if original:
+        ax.fill(vertices[0], vertices[1], color='gray', alpha=0.5, label='Original')
+
+    # Set fixed plot limits to -10 to 10 on both axes
+    ax.set_xlim(-10, 10)
+    ax.set_ylim(-10, 10)
+
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.axhline(0, color='black', linewidth=0.5)
+    ax.axvline(0, color='black', linewidth=0.5)
+    ax.grid()
+
+    # Crop the figure to its tight bounding box, as savefig does, with the
+    # axes moving by the same fraction of a pixel
+    ax.set_title(title)
+    bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(0.1)
+    position = ax.get_position().transformed(fig.transFigure + fig.dpi_scale_trans.inverted())
+    fig.set_size_inches(bbox.width, bbox.height)
+    ax.set_position(position.translated(-bbox.x0, -bbox.y0).transformed(fig.dpi_scale_trans + fig.transFigure.inverted()))
+    ax.set_title("")
+
+    overlays = canvas_overlays(ax)
+    for artist in overlays:
+        artist.set_visible(False)
+    fig.canvas.draw()
+    for artist in overlays:
+        artist.set_visible(True)
+    title_region = Bbox.from_extents(fig.bbox.x0, ax.bbox.y1 + 2, fig.bbox.x1, fig.bbox.y1)
+    return fig, ax, fig.canvas.copy_from_bbox(title_region)
+
+def canvas_overlays(ax):
+    """Return the artists plot_triangles draws above the triangles, in drawing order."""
+    return ax.xaxis.get_gridlines() + ax.yaxis.get_gridlines() + list(ax.lines) + list(ax.spines.values())
+
+def draw_triangles(ax, triangles, color, cull=True):
+    """Draw an (N, 2, 3) array of triangles onto the canvas of ax.
+
+    If cull is True, triangles outside the [-10, 10] window are skipped and
+    sub-pixel triangles are drawn as single pixels (see cull_triangles).
+
+    Returns:
+        dict: Number of 'culled', 'kept' and 'points' triangles.
+    """
+    from matplotlib.collections import PolyCollection
+    triangles = np.asarray(triangles, dtype=float)
+    points = None
+    counts = {'culled': 0, 'kept': len(triangles), 'points': 0}
+    if cull:
+        pixel_size = (DEFAULT_EXTENT[1] - DEFAULT_EXTENT[0]) / ax.bbox.width
+        with timer('render.cull'):
+            triangles, points, counts = cull_triangles(triangles, pixel_size)
+        count_culling(counts)
     
-    result = points
-    for label in sequence:
-        result = np.dot(matrix_map[label], result)
+    with timer('render.polycollection'):
+        poly = PolyCollection(np.transpose(triangles, (0, 2, 1)), facecolors=color, alpha=0.6, edgecolors='black', linewidths=0.3)
+        ax.add_collection(poly)
+    with timer('render.draw'):
+        ax.draw_artist(poly)
+        poly.remove()
+        if points is not None and len(points):
+            (pixels,) = ax.plot(points[:, 0], points[:, 1], ',', color=color, alpha=0.6, zorder=poly.get_zorder())
+            ax.draw_artist(pixels)
+            pixels.remove()
+    return counts
+
+def save_canvas(fig, ax, filename, title, title_background):
+    """Save a snapshot of the canvas like plt.savefig(filename, dpi=150, bbox_inches='tight')."""
+    fig.canvas.restore_region(title_background)
+    ax.set_title(title)
+    ax.draw_artist(ax.title)
+
+    # The overlays are only drawn on a copy, the canvas keeps the triangles alone
+    triangles_only = fig.canvas.copy_from_bbox(fig.bbox)
+    for artist in canvas_overlays(ax):
+        ax.draw_artist(artist)
+    image = np.array(fig.canvas.buffer_rgba())
+    fig.canvas.restore_region(triangles_only)
+
+    print(f"Saving plot to: {filename}")
+    with timer('render.savefig'):
+        pyplot().imsave(filename, image, dpi=fig.dpi)
+    add_count('bytes_written', os.path.getsize(filename))
+
+# Generation modes of plot_all_combinations and the mode_options each accepts
+GENERATION_MODES = {
+    'levels': ('store',),  # whole levels (iter_steps), optionally persisted
+    'chunks': ('chunk_size',),  # bounded-memory chunks (iter_step_chunks)
+    'dedup': ('growth',),  # one word per group element (iter_group_steps)
+    'cached': ('cache_folder', 'max_bytes'),  # persistent product cache (iter_cached_steps)
+    'pruned': ('region', 'pruning'),  # words that can still reach a region (iter_pruned_steps)
+    'sampled': ('samples', 'seed', 'chunk_size'),  # seeded random walks (iter_sampled_steps)
+    'sharded': ('prefix_length', 'retries'),  # resumable shards on a process pool (iter_sharded_steps)
+}
+
+# Job options supported by plot_combinations_parallel, and the only value it
+# accepts for backend and mode (incremental is accepted since both drawing
+# modes write the same frames)
+PARALLEL_JOB_OPTIONS = (
+    'max_step', 'labels', 'vertices', 'matrix_map', 'color', 'output_folder', 'title_prefix',
+    'inverses', 'exact', 'cull', 'incremental', 'mode_options'
+)
+PARALLEL_JOB_VALUES = {'backend': 'polycollection', 'mode': 'levels'}
+
+def check_generation_mode(mode, mode_options=None):
+    """Validate a generation mode and its options (see GENERATION_MODES).
+
+    Returns:
+        dict: A copy of mode_options (empty if None).
+    """
+    if mode not in GENERATION_MODES:
+        raise ValueError(f"Unknown mode {mode!r}, use {', '.join(map(repr, GENERATION_MODES))}")
+    options = dict(mode_options or {})
+    unknown = sorted(set(options) - set(GENERATION_MODES[mode]))
+    if unknown:
+        accepted = ', '.join(GENERATION_MODES[mode]) or 'no options'
+        raise ValueError(f"Mode {mode!r} does not accept {', '.join(unknown)} (it accepts {accepted})")
+    return options
+
+def iter_mode_steps(mode, max_step, labels, vertices, matrix_map, mode_options=None, inverses=None, exact=False, output_folder="Spanning", processes=None):
+    """Generate the (step, triangles, labels) chunks of a generation mode, in step order.
+
+    Args:
+        mode: Generation mode, a key of GENERATION_MODES
+        max_step: Maximum word length
+        labels: String of matrix labels
+        vertices: Seed triangle (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        mode_options: Optional dictionary of the mode's options, passed on to
+            its generator
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to compute the word products exactly
+        output_folder: Folder holding the stored levels ('levels' mode with
+            store) or the shards ('sharded' mode)
+        processes: Number of shard workers ('sharded' mode)
+
+    Returns:
+        Iterator over the chunks; whole-level modes yield one chunk per step.
+    """
+    options = check_generation_mode(mode, mode_options)
+    if mode == 'levels':
+        store_folder = os.path.join(output_folder, "levels") if options.get('store') else None
+        return iter_steps(max_step, labels, vertices, matrix_map, None, inverses=inverses, exact=exact, store_folder=store_folder)
+    elif mode == 'chunks':
+        return iter_step_chunks(max_step, labels, vertices, matrix_map, inverses=inverses, exact=exact, **options)
+    elif mode == 'dedup':
+        return iter_group_steps(max_step, labels, vertices, matrix_map, inverses=inverses, **options)
+    elif mode == 'cached':
+        return iter_cached_steps(max_step, labels, vertices, matrix_map, inverses=inverses, exact=exact, **options)
+    elif mode == 'pruned':
+        return iter_pruned_steps(max_step, labels, vertices, matrix_map, inverses=inverses, exact=exact, **options)
+    elif mode == 'sampled':
+        return iter_sampled_steps(max_step, labels, vertices, matrix_map, inverses=inverses, **options)
+    return iter_sharded_steps(
+        max_step, labels, vertices, matrix_map, os.path.join(output_folder, "shards"),
+        processes=processes, inverses=inverses, exact=exact, **options
+    )
+
+# Figure templates of the frames rendered by this process, by seed
+_frame_templates = {}
+
+def render_frame(frame):
+    """Render one Step_n.png from triangles in shared memory (process pool worker).
+
+    Args:
+        frame: Dictionary built by plot_combinations_parallel with the shared
+            triangles spec, the number of accumulated triangles to draw and
+            the plot_triangles arguments.
+    """
+    # Each worker keeps one figure template per seed for all its frames
+    key = np.asarray(frame['vertices']).tobytes()
+    if key not in _frame_templates:
+        _frame_templates[key] = create_figure_template(frame['vertices'], original=True)
     
-    cache[sequence_key] = result
-    return result
+    shm, triangles = attach_array(frame['triangles'])
+    try:
+        plot_triangles(
+            triangles[:frame['count']],
+            frame['title'],
+            frame['color'],
+            frame['vertices'],
+            original=True,
+            step=frame['step'],
+            output_folder=frame['output_folder'],
+            cull=frame['cull'],
+            template=_frame_templates[key]
+        )
+    finally:
+        del triangles
+        shm.close()
+
+def plot_combinations_parallel(jobs, processes=None):
+    """Render the frames of several plot_all_combinations jobs on a process pool.
 
-def generate_steps(max_step, labels, vertices, matrix_map, cache):
-    """Generate transformations for all steps."""
-    all_steps = []
-    current_step_triangles = [vertices]
+    Every job is generated once in this process, one level at a time, and
+    its triangles are written in step order into one shared memory block
+    sized from the level sizes, so the accumulated triangles of step n are a
+    prefix of it. Each (job, step) frame is then an independent task that
+    plots that prefix with plot_triangles and writes the same Step_n.png as
+    the sequential path.
+
+    Args:
+        jobs: List of dictionaries of plot_all_combinations arguments
+            (max_step, labels, vertices, matrix_map and optionally color,
+            output_folder, title_prefix, inverses, exact, cull, incremental
+            and the 'levels' mode with its store option)
+        processes: Number of worker processes (defaults to os.cpu_count())
+
+    Raises:
+        ValueError: If a job sets any other option (e.g. backend='raster' or
+            another mode), which the parallel frames cannot honour.
+    """
+    for job in jobs:
+        unsupported = sorted(
+            name for name, value in job.items()
+            if name not in PARALLEL_JOB_OPTIONS and value is not None
+            and not (name in PARALLEL_JOB_VALUES and value == PARALLEL_JOB_VALUES[name])
+        )
+        if unsupported:
+            raise ValueError(
+                f"Parallel frames are rendered with PolyCollection from whole levels and do not support {', '.join(unsupported)}; "
+                "render without processes instead"
+            )
+        check_generation_mode('levels', job.get('mode_options'))
     
-    for step in range(1, max_step + 1):
-        print(f"Step {step}")
+    blocks = []
+    frames = []
+    try:
+        for job in jobs:
+            store = (job.get('mode_options') or {}).get('store')
+            store_folder = os.path.join(job.get('output_folder', "Spanning"), "levels") if store else None
+            total = sum(level_sizes(job['max_step'], job['labels'], job.get('inverses')))
+            shm, spec, shared = create_shared_array((total, 2, 3), float)
+            blocks.append(shm)
+            
+            count = 0
+            try:
+                for step, triangles, _ in iter_steps(
+                    job['max_step'], job['labels'], job['vertices'], job['matrix_map'], None,
+                    inverses=job.get('inverses'), exact=job.get('exact', False), store_folder=store_folder
+                ):
+                    shared[count:count + len(triangles)] = triangles
+                    count += len(triangles)
+                    frames.append({
+                        'triangles': spec,
+                        'count': count,
+                        'step': step,
+                        'title': f"Step {step}: Accumulated Transformations {job.get('title_prefix', '')}",
+                        'color': job.get('color', 'purple'),
+                        'vertices': job['vertices'],
+                        'output_folder': job.get('output_folder', "Spanning"),
+                        'cull': job.get('cull', True),
+                    })
+            finally:
+                del shared
+        
+        # Largest frames first so that the pool stays busy until the end
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(render_frame, sorted(frames, key=lambda frame: -frame['count']), chunksize=1)
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+def render_step_chunks(chunks, vertices, color='purple', output_folder="Spanning", title_prefix="", backend='polycollection', resolution=1500, log_density=False, cull=True, coverage=None, tile_levels=5, tile_extent=TILE_EXTENT):
+    """Render a stream of (step, triangles, labels) chunks, one Step_n.png per step.
+
+    Chunks must come in step order, as produced by iter_steps or
+    iter_step_chunks. Each step is drawn incrementally on top of the previous
+    ones (see plot_all_combinations for the backends and culling). With
+    backend='tiles', all the steps are instead accumulated into one tile
+    pyramid written to output_folder/tiles at the end.
+
+    If coverage (from coverage_utils.create_coverage) is given, its statistics
+    are updated and printed per step, and rendering stops after the first step
+    that meets its stopping settings; the remaining chunks are not consumed.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    if backend == 'raster':
+        grid = create_density_grid(resolution)
+    elif backend == 'tiles':
+        pyramid = create_pyramid(tile_levels, tile_extent)
+    else:
+        title = f"Step 0: Accumulated Transformations {title_prefix}"
+        fig, ax, title_background = create_canvas(vertices, original=True, title=title)
         
-        step_labels = generate_combinations(step, labels)
-        new_triangles = [
-            apply_sequence_with_cache(list(comb), vertices, matrix_map, cache)
-            for comb in step_labels
-        ]
+    for step, step_chunks in groupby(chunks, key=lambda chunk: chunk[0]):
+        new_triangles = 0
+        step_counts = {'culled': 0, 'kept': 0, 'points': 0}
+        for _, triangles, _ in step_chunks:
+            if backend == 'raster':
+                with timer('render.rasterize'):
+                    rasterize_triangles(triangles, grid)
+            elif backend == 'tiles':
+                with timer('render.rasterize'):
+                    add_pyramid_triangles(pyramid, triangles)
+            else:
+                for name, count in draw_triangles(ax, triangles, color, cull=cull).items():
+                    step_counts[name] += count
+            if coverage is not None:
+                with timer('coverage.update'):
+                    add_triangles(coverage, triangles)
+            new_triangles += len(triangles)
+        if backend == 'polycollection' and cull:
+            print(f"Culled {step_counts['culled']} triangles, kept {step_counts['kept']}, drawn {step_counts['points']} as points")
+            
+        filename = os.path.join(output_folder, f"Step_{step}.png")
+        if backend == 'raster':
+            with timer('render.savefig'):
+                save_density_png(grid, filename, color=color, log_density=log_density)
+            add_count('bytes_written', os.path.getsize(filename))
+        elif backend == 'polycollection':
+            title = f"Step {step}: Accumulated Transformations {title_prefix}"
+            save_canvas(fig, ax, filename, title, title_background)
+        print(f"Completed step {step} with {new_triangles} new triangles")
         
-        current_step_triangles.extend(new_triangles)
-        all_steps.append((step, new_triangles, step_labels))
-    
-    return all_steps
+        if coverage is not None:
+            with timer('coverage.stats'):
+                stats = finish_step(coverage, step)
+            print(format_stats(stats))
+        record_step(step)
+        if coverage is not None and should_stop(coverage):
+            print(f"Coverage stopped changing or reached its threshold, stopping after step {step}")
+            break
+        
+    if backend == 'tiles':
+        with timer('render.savefig'):
+            save_pyramid(pyramid, os.path.join(output_folder, "tiles"), color=color, log_density=log_density)
+    elif backend == 'polycollection':
+        pyplot().close(fig)
+
+def plot_all_combinations(max_step, labels, vertices, matrix_map, color='purple', output_folder="Spanning", title_prefix="", inverses=None, exact=False, mode='levels', mode_options=None, incremental=True, backend='polycollection', resolution=1500, log_density=False, cull=True, processes=None, coverage=None, tile_levels=5, tile_extent=TILE_EXTENT):
+    """Plot all possible combinations of transformations up to max_step.
+
+    By default every step is drawn onto one persistent canvas: only the
+    triangles new at that step are drawn before its snapshot is saved, so
+    earlier steps are never redrawn. With incremental=False the accumulated
+    triangles are re-plotted with plot_triangles at every step.
+
+    If inverses is given, only freely reduced words are plotted. If exact is
+    True, the triangles are generated with exact integer arithmetic.
+
+    mode selects how the triangles are generated (see iter_mode_steps), with
+    its settings in the mode_options dictionary:
+    - 'levels' (default): whole levels with iter_steps. With store=True they
+      are persisted as memory-mapped files in output_folder/levels, and a
+      later run with the same settings resumes from them.
+    - 'chunks': chunks of at most chunk_size triangles with iter_step_chunks,
+      so memory stays bounded regardless of max_step. Needs incremental
+      drawing or a raster or tiles backend.
+    - 'dedup': words reaching an already seen matrix are dropped, so every
+      group element is drawn once (iter_group_steps); the matrix map must
+      hold integer matrices. Given a growth list, the distinct elements and
+      words of each level are appended to it.
+    - 'cached': the word products are read from or added to the persistent
+      cache in cache_folder (DEFAULT_CACHE_FOLDER by default), shared by
+      every run with the same generators (iter_cached_steps).
+    - 'pruned': the words that provably cannot bring their triangle back
+      into region (DEFAULT_EXTENT by default) before max_step are not
+      expanded (iter_pruned_steps). Given a pruning list, the number of
+      words pruned and kept at each level is appended to it.
+    - 'sampled': only samples seeded random walks are followed instead of
+      every word, in chunks of chunk_size walks (iter_sampled_steps), so each
+      step costs the same whatever max_step; the images show a uniform
+      sample of each level. Not combined with exact.
+    - 'sharded': the word tree is split into one shard per word of
+      prefix_length letters, expanded on a pool of processes workers into
+      output_folder/shards with failed shards retried retries times
+      (iter_sharded_steps). A later run resumes the incomplete shards, and
+      the same triangles are drawn as with 'levels'.
+
+    With backend='raster', triangles are rasterized with raster_utils into a
+    resolution x resolution grid over [-10, 10]^2 instead of being drawn with
+    PolyCollection. Each step is written as an occupancy image in color, or
+    as a log-density heatmap if log_density is True (no axes or title).
+    With backend='tiles', the triangles of all steps are binned into a
+    zoomable pyramid of tile_levels levels over tile_extent instead (see
+    tile_utils), written to output_folder/tiles.
+    Otherwise, if cull is True, triangles outside the window are skipped and
+    sub-pixel triangles are drawn as single pixels before PolyCollection is
+    built, and the counts are reported per step.
 
-def plot_all_combinations(max_step, labels, vertices, matrix_map, color='purple', output_folder="Spanning", title_prefix=""):
-    """Plot all possible combinations of transformations up to max_step."""
-    cache = {}
-    all_steps = generate_steps(max_step, labels, vertices, matrix_map, cache)
+    If processes is given in 'levels' mode, the steps are rendered as
+    independent frames on a process pool with plot_combinations_parallel.
+    This is only supported by the PolyCollection backend. In 'sharded' mode
+    it is the size of the generation pool instead; the other modes do not
+    use it.
+
+    If coverage (from coverage_utils.create_coverage) is given, the covered
+    fraction of the window is tracked per step and the run stops early once
+    it meets the coverage's threshold or patience settings. Levels are
+    generated lazily, so the skipped steps are not generated either. This
+    needs the steps rendered in order, so it is not combined with
+    incremental=False or parallel frames on the PolyCollection backend.
+
+    When instrumentation is enabled (see instrument_utils), the time spent in
+    every generation and rendering stage and the counters of each step are
+    printed after the step and optionally written to a trace file.
+    """
+    if backend not in ('polycollection', 'raster', 'tiles'):
+        raise ValueError(f"Unknown backend {backend!r}, use 'polycollection', 'raster' or 'tiles'")
+    mode_options = check_generation_mode(mode, mode_options)
+    if mode == 'sampled' and exact:
+        raise ValueError("Mode 'sampled' cannot be combined with exact, random walks are computed in float64")
+    if processes is not None and mode not in ('levels', 'sharded'):
+        raise ValueError(f"processes renders 'levels' frames or sizes the 'sharded' pool, mode {mode!r} does not use it")
+    parallel = processes is not None and mode == 'levels'
+    if backend == 'polycollection' and mode == 'chunks' and not incremental:
+        raise ValueError("Mode 'chunks' cannot be combined with incremental=False, which re-plots whole accumulated levels")
+    if coverage is not None and backend == 'polycollection' and (not incremental or parallel):
+        raise ValueError("coverage is only tracked when the steps are rendered in order, not with incremental=False or parallel frames")
+    
+    if parallel:
+        if backend != 'polycollection':
+            raise ValueError(f"processes renders PolyCollection frames and cannot be combined with backend {backend!r}")
+        plot_combinations_parallel([{
+            'max_step': max_step,
+            'labels': labels,
+            'vertices': vertices,
+            'matrix_map': matrix_map,
+            'color': color,
+            'output_folder': output_folder,
+            'title_prefix': title_prefix,
+            'inverses': inverses,
+            'exact': exact,
+            'cull': cull,
+            'mode_options': mode_options,
+        }], processes=processes)
+        return
+    
+    chunks = iter_mode_steps(
+        mode, max_step, labels, vertices, matrix_map, mode_options, inverses=inverses, exact=exact,
+        output_folder=output_folder, processes=processes
+    )
+    if incremental or backend != 'polycollection':
+        render_step_chunks(
+            chunks, vertices, color=color, output_folder=output_folder, title_prefix=title_prefix,
+            backend=backend, resolution=resolution, log_density=log_density, cull=cull, coverage=coverage,
+            tile_levels=tile_levels, tile_extent=tile_extent
+        )
+        return
+    
+    # One entry per step, also for the modes yielding several chunks per step
+    all_steps = (
+        (step, np.concatenate([np.asarray(triangles, dtype=float) for _, triangles, _ in step_chunks]), None)
+        for step, step_chunks in groupby(chunks, key=lambda chunk: chunk[0])
+    )
     
     # List to store accumulated triangles
     cumulative_triangles = []
+    template = create_figure_template(vertices, original=True)
     
     # Plot each step
     for step, step_triangles, step_labels in all_steps:
-        cumulative_triangles.extend(step_triangles)
+        cumulative_triangles.append(np.asarray(step_triangles, dtype=float))
         title = f"Step {step}: Accumulated Transformations {title_prefix}"
         plot_triangles(
-            cumulative_triangles, 
+            np.concatenate(cumulative_triangles), 
             title, 
             color, 
             vertices,
             original=True, 
             step=step,
-            output_folder=output_folder
+            output_folder=output_folder,
+            cull=cull,
+            template=template
         )
-        print(f"Completed step {step} with {len(step_triangles)} new triangles") 
\ No newline at end of file
+        print(f"Completed step {step} with {len(step_triangles)} new triangles") 
+        record_step(step)
+    
+    pyplot().close(template['fig'])
+
+def plot_seed_combinations(max_step, labels, seeds, matrix_map, colors, output_folders, title_prefixes, inverses=None, exact=False, product_cache=None, **render_options):
+    """Plot the combinations of several seed triangles sharing the same matrices.
+
+    The word products are computed once for all seeds with
+    generate_seed_steps, then each seed is rendered into its own folder as
+    plot_all_combinations would.
+
+    Args:
+        max_step: Maximum word length
+        labels: String of matrix labels
+        seeds: Sequence of seed triangles (in columns)
+        matrix_map: Dictionary mapping labels to matrices
+        colors: Color of each seed's triangles
+        output_folders: Output folder of each seed
+        title_prefixes: Title prefix of each seed
+        inverses: Optional dictionary mapping labels to their inverse labels
+        exact: Whether to compute the word products exactly
+        product_cache: Optional product cache folder (see iter_cached_steps)
+        **render_options: Options for render_step_chunks (backend, cull, ...)
+    """
+    seed_steps = generate_seed_steps(
+        max_step, labels, seeds, matrix_map, None, inverses=inverses, exact=exact, product_cache=product_cache
+    )
+    
+    for seed, steps, color, output_folder, title_prefix in zip(seeds, seed_steps, colors, output_folders, title_prefixes):
+        print(f"\nRendering {output_folder}")
+        render_step_chunks(
+            steps, seed, color=color, output_folder=output_folder, title_prefix=title_prefix, **render_options
+        )
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+On-disk store of generated levels as memory-mappable .npy files.
+
+Each completed level n is written to the store folder as:
+- level_{n}_triangles.npy: the (N, 2, 3) triangles (float64 if exact values overflowed int64)
+- level_{n}_words.npy: the words packed as uint64 codes (see word_utils)
+- level_{n}_generators.npy: the label index of the last letter of each word
+- level_{n}_points.npy, level_{n}_wide.npy, level_{n}_wide_points.npy: the
+  exact level state, only in exact mode
+- level_{n}.json: manifest written last, marking the level as complete
+
+The manifest records a fingerprint of the generation settings and of the
+word encoding, so levels written for other matrices, seeds or modes are
+never resumed from.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from src.utils.instrument_utils import add_count
+
+def level_fingerprint(labels, matrices, seed, positions, exact):
+    """Hash everything that determines the content of the generated levels."""
+    digest = hashlib.sha1()
+    digest.update(labels.encode())
+    for array in (np.asarray(matrices), np.asarray(seed)):
+        digest.update(array.dtype.str.encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(b'all words' if positions is None else np.asarray(positions).tobytes())
+    digest.update(b'exact' if exact else b'float')
+    digest.update(b'packed words')
+    return digest.hexdigest()
+
+def _level_path(folder, step, name):
+    return os.path.join(folder, f"level_{step}_{name}.npy")
+
+def _save_array(folder, step, name, array, allow_pickle=False):
+    """Write an array atomically and reopen it as a read-only memory map."""
+    path = _level_path(folder, step, name)
+    with open(path + ".tmp", 'wb') as handle:
+        np.save(handle, array, allow_pickle=allow_pickle)
+    os.replace(path + ".tmp", path)
+    add_count('bytes_written', os.path.getsize(path), step=step)
+    return None if allow_pickle else np.load(path, mmap_mode='r')
+
+def save_level(folder, step, fingerprint, triangles, words, generators, exact_state=None):
+    """Persist a completed level.
+
+    Args:
+        folder: Store folder
+        step: Word length of the level
+        fingerprint: Value returned by level_fingerprint
+        triangles: (N, 2, 3) array of triangles
+        words: Packed words (see word_utils)
+        generators: Label index of the last letter of each word
+        exact_state: Exact level (points, wide, wide_points) in exact mode
+
+    Returns:
+        tuple: (triangles, words) reopened as read-only memory maps.
+    """
+    os.makedirs(folder, exist_ok=True)
+    if triangles.dtype == object:
+        triangles = triangles.astype(float)
+    triangles = _save_array(folder, step, 'triangles', triangles)
+    words = _save_array(folder, step, 'words', words)
+    _save_array(folder, step, 'generators', generators.astype(np.uint8))
+    if exact_state is not None:
+        points, wide, wide_points = exact_state
+        _save_array(folder, step, 'points', points)
+        _save_array(folder, step, 'wide', wide)
+        _save_array(folder, step, 'wide_points', wide_points, allow_pickle=True)
+
+    manifest = {'fingerprint': fingerprint, 'step': step, 'count': len(triangles), 'exact': exact_state is not None}
+    path = os.path.join(folder, f"level_{step}.json")
+    with open(path + ".tmp", 'w') as handle:
+        json.dump(manifest, handle)
+    os.replace(path + ".tmp", path)
+    return triangles, words
+
+def is_level_complete(folder, step, fingerprint):
+    """Check whether level step was completely written with the same settings."""
+    path = os.path.join(folder, f"level_{step}.json")
+    if not os.path.exists(path):
+        return False
+    with open(path) as handle:
+        return json.load(handle).get('fingerprint') == fingerprint
+
+def deepest_level(folder, fingerprint, max_step):
+    """Return the deepest step up to max_step such that all levels up to it are stored."""
+    step = 0
+    while step < max_step and is_level_complete(folder, step + 1, fingerprint):
+        step += 1
+    return step
+
+def load_level(folder, step, exact=False):
+    """Open a stored level without copying it.
+
+    Returns:
+        dict: 'triangles', 'words' and 'generators' as read-only memory maps
+        and, in exact mode, 'state' with the exact level to resume from.
+    """
+    stored = {name: np.load(_level_path(folder, step, name), mmap_mode='r') for name in ('triangles', 'words', 'generators')}
+    if exact:
+        stored['state'] = (
+            np.load(_level_path(folder, step, 'points'), mmap_mode='r'),
+            np.load(_level_path(folder, step, 'wide'), mmap_mode='r'),
+            np.load(_level_path(folder, step, 'wide_points'), allow_pickle=True),
+        )
+    else:
+        stored['state'] = stored['triangles']
+    return stored
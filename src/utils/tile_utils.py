@@ -0,0 +1,135 @@
+"""
+Multi-resolution tile pyramid of triangle hit counts for deep zoom.
+
+A pyramid covers a square extent with zoom levels 0 to levels - 1; level z
+is split into 2**z x 2**z tiles of tile_size x tile_size pixels, so the
+finest level has a resolution of tile_size * 2**(levels - 1) pixels per side.
+
+Triangles are rasterized once, at the finest level, one band of tile rows at
+a time (see raster_utils), and only the non-empty finest tiles are kept, as
+int32 hit counts. Whether a triangle contains no pixel centre, and is then
+splatted at its centroid, is decided over the whole finest level, so the
+finest tiles match rasterize_triangles over the full extent pixel for pixel. Coarser levels are obtained by summing 2 x 2 blocks of
+pixels of the level below, and only non-empty tiles are written, as
+tiles/{z}/{x}/{y}.png with y = 0 at the top (the usual slippy-map layout),
+next to a tiles.json describing the pyramid.
+"""
+import json
+import os
+import numpy as np
+from src.utils.raster_utils import centroid_pixels, cover_triangles, grid_counts, save_counts_png
+
+# Default extent of a pyramid, four times the plotting window in each direction
+TILE_EXTENT = (-40, 40, -40, 40)
+
+def create_pyramid(levels=5, extent=TILE_EXTENT, tile_size=256):
+    """Create an empty tile pyramid.
+
+    Args:
+        levels: Number of zoom levels
+        extent: (xmin, xmax, ymin, ymax) covered by the pyramid
+        tile_size: Width and height of a tile in pixels
+
+    Returns:
+        dict: The pyramid, to fill with add_pyramid_triangles.
+    """
+    return {'levels': levels, 'extent': extent, 'tile_size': tile_size, 'tiles': {}}
+
+def add_pyramid_triangles(pyramid, triangles):
+    """Add the hits of a chunk of (N, 2, 3) triangles to the finest tiles."""
+    triangles = np.asarray(triangles, dtype=float)
+    xmin, xmax, ymin, ymax = pyramid['extent']
+    tile_size = pyramid['tile_size']
+    count = 2 ** (pyramid['levels'] - 1)
+    band_height = (ymax - ymin) / count
+    lower, upper = triangles[:, 1].min(axis=1), triangles[:, 1].max(axis=1)
+    hit = np.zeros(len(triangles), dtype=bool)
+
+    for row in range(count):
+        band_top = ymax - row * band_height
+        band_bottom = band_top - band_height
+        selected = (upper >= band_bottom) & (lower <= band_top)
+        if not selected.any():
+            continue
+        # One density grid for a band of tiles across the whole width
+        grid = np.zeros((tile_size, tile_size * count + 1), dtype=np.int64)
+        hit[selected] |= cover_triangles(triangles[selected], grid, (xmin, xmax, band_bottom, band_top))
+        counts = grid_counts(grid)
+        for column in range(count):
+            tile = counts[:, column * tile_size:(column + 1) * tile_size]
+            if tile.any():
+                _tile(pyramid, column, row)[...] += tile.astype(np.int32)
+
+    # Triangles without a pixel centre in any band are splatted once, at their centroid
+    rows, columns = centroid_pixels(triangles[~hit], (tile_size * count, tile_size * count), pyramid['extent'])
+    for column, row in set(zip((columns // tile_size).tolist(), (rows // tile_size).tolist())):
+        inside = (columns // tile_size == column) & (rows // tile_size == row)
+        np.add.at(_tile(pyramid, column, row), (rows[inside] % tile_size, columns[inside] % tile_size), 1)
+
+def _tile(pyramid, column, row):
+    """Return the finest tile at (column, row), creating it empty if needed."""
+    key = (column, row)
+    if key not in pyramid['tiles']:
+        size = pyramid['tile_size']
+        pyramid['tiles'][key] = np.zeros((size, size), dtype=np.int32)
+    return pyramid['tiles'][key]
+
+def finest_counts(pyramid):
+    """Assemble the finest level into one array of hit counts (row 0 at the top)."""
+    tile_size = pyramid['tile_size']
+    size = tile_size * 2 ** (pyramid['levels'] - 1)
+    counts = np.zeros((size, size), dtype=np.int64)
+    for (column, row), tile in pyramid['tiles'].items():
+        counts[row * tile_size:(row + 1) * tile_size, column * tile_size:(column + 1) * tile_size] = tile
+    return counts
+
+def _coarser(tiles, tile_size):
+    """Build the non-empty tiles of the next coarser level."""
+    half = tile_size // 2
+    coarser = {}
+    for (column, row), tile in tiles.items():
+        key = (column // 2, row // 2)
+        if key not in coarser:
+            coarser[key] = np.zeros((tile_size, tile_size), dtype=np.int32)
+        # Sum 2 x 2 pixel blocks into the matching quarter of the parent tile
+        summed = tile.reshape(half, 2, half, 2).sum(axis=(1, 3))
+        top, left = (row % 2) * half, (column % 2) * half
+        coarser[key][top:top + half, left:left + half] += summed
+    return coarser
+
+def pyramid_levels(pyramid):
+    """Yield (zoom, tiles) for every level, from the finest to the coarsest."""
+    tiles = pyramid['tiles']
+    for zoom in range(pyramid['levels'] - 1, -1, -1):
+        yield zoom, tiles
+        if zoom:
+            tiles = _coarser(tiles, pyramid['tile_size'])
+
+def save_pyramid(pyramid, folder, color='purple', log_density=False):
+    """Write the non-empty tiles of every level and the tiles.json description.
+
+    With log_density, all tiles of a level share the colour scale of that
+    level's largest count.
+
+    Returns:
+        int: Number of tiles written.
+    """
+    written = 0
+    for zoom, tiles in pyramid_levels(pyramid):
+        vmax = max((int(tile.max()) for tile in tiles.values()), default=1)
+        for (column, row), tile in tiles.items():
+            tile_folder = os.path.join(folder, str(zoom), str(column))
+            os.makedirs(tile_folder, exist_ok=True)
+            save_counts_png(tile, os.path.join(tile_folder, f"{row}.png"), color=color, log_density=log_density, vmax=vmax)
+            written += 1
+        print(f"Saved {len(tiles)} tiles of zoom level {zoom} to: {folder}")
+
+    description = {
+        'levels': pyramid['levels'],
+        'extent': list(pyramid['extent']),
+        'tile_size': pyramid['tile_size'],
+        'layout': "{z}/{x}/{y}.png, y = 0 at the top",
+    }
+    with open(os.path.join(folder, "tiles.json"), 'w') as handle:
+        json.dump(description, handle, indent=2)
+    return written
@@ -0,0 +1,80 @@
+"""
+Words packed as base-|labels| integers instead of Python strings.
+
+A word of n letters over the labels is stored as the uint64 code
+sum(index(letter_i) * |labels|^(n - 1 - i)), first letter most significant.
+All the words of a level have the same length (the step), so the length is
+never stored; the empty word is 0. Appending a letter is one multiply-add,
+and codes sort like the words, so the levels, ordered by parent and then
+label, are increasing arrays of codes. Words up to max_word_length letters
+fit in 64 bits (24 letters over 6 labels, 32 over 4).
+"""
+import numpy as np
+
+# Dtype of packed words
+WORD_DTYPE = np.uint64
+
+def max_word_length(size):
+    """Return the longest word length over size labels whose codes fit in 64 bits."""
+    if size < 2:
+        return np.iinfo(np.int64).max
+    length = 0
+    while size ** (length + 1) <= 2 ** 64:
+        length += 1
+    return length
+
+def check_word_length(length, size):
+    """Raise a ValueError if words of this length over size labels do not fit in 64 bits."""
+    if length > max_word_length(size):
+        raise ValueError(
+            f"Words of {length} letters over {size} labels do not fit in 64 bits "
+            f"(at most {max_word_length(size)} letters)"
+        )
+
+def root_words():
+    """Return the level of the empty word."""
+    return np.zeros(1, dtype=WORD_DTYPE)
+
+def extend_words(words, parents, generators, size):
+    """Build the words of an expanded level from their parent words.
+
+    Args:
+        words: Packed words of the previous level
+        parents: Index into words of each new word
+        generators: Label index of the letter appended to each new word
+        size: Number of labels
+
+    Returns:
+        Array of packed words aligned with parents.
+    """
+    return np.asarray(words, dtype=WORD_DTYPE)[parents] * WORD_DTYPE(size) + np.asarray(generators).astype(WORD_DTYPE)
+
+def encode_words(words, labels):
+    """Pack words given as strings (all of the same length) over labels."""
+    words = list(words)
+    if not words:
+        return np.zeros(0, dtype=WORD_DTYPE)
+    check_word_length(len(words[0]), len(labels))
+    codes = np.zeros(len(words), dtype=WORD_DTYPE)
+    letters = np.array([[labels.index(letter) for letter in word] for word in words], dtype=WORD_DTYPE)
+    for column in letters.T:
+        codes = codes * WORD_DTYPE(len(labels)) + column
+    return codes
+
+def decode_words(words, length, labels):
+    """Unpack words of the given length back to strings over labels.
+
+    Returns:
+        list: The words as strings, in order.
+    """
+    words = np.asarray(words, dtype=WORD_DTYPE)
+    if length == 0:
+        return [''] * len(words)
+    powers = WORD_DTYPE(len(labels)) ** np.arange(length - 1, -1, -1, dtype=WORD_DTYPE)
+    digits = (words[:, np.newaxis] // powers) % WORD_DTYPE(len(labels))
+    letters = np.array(list(labels))[digits.astype(np.int64)]
+    return letters.view(f'<U{length}').ravel().tolist()
+
+def decode_word(word, length, labels):
+    """Unpack a single word of the given length back to a string over labels."""
+    return decode_words([word], length, labels)[0]